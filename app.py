@@ -1,52 +1,210 @@
 import os
 import json
-import pandas as pd
-import numpy as np
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, Response
+import time
+import threading
+from contextlib import contextmanager
+from flask import Flask, Request, current_app, render_template, request, jsonify, redirect, url_for, flash, session, Response, send_file, g, has_request_context
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
-import boto3
-from botocore.exceptions import ClientError
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.utils import PlotlyJSONEncoder
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report, confusion_matrix
 import pickle
-import io
-from datetime import datetime
+import copy
+import tempfile
 import uuid
+from collections import defaultdict
+from chart_cache import ChartCache
+from chart_sampling import density_grid, stratified_sample
+from clustering import RiskClusters
+from exports import iter_chunks, iter_csv, iter_json, iter_ndjson, write_excel
+from features import FeaturePipeline
+from forest_inference import CompiledForest
+from jobs import JobQueue
+from lazy_imports import LazyModule
+from metrics import Metrics
+from model_registry import ModelRegistry
+from parallelism import limit_native_threads, worker_n_jobs
+from portfolio_aggregates import compute_aggregates
+from portfolio_store import PortfolioStore
+from recommendation_engine import RecommendationEngine
+from score_cache import ScoreCache
+from storage import LocalStorage, MemoryStorage, S3Storage
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv('config.env')
 
+# Heavy dependencies are imported on first use, keeping worker cold starts fast
+pd = LazyModule('pandas')
+np = LazyModule('numpy')
+px = LazyModule('plotly.express')
+go = LazyModule('plotly.graph_objects')
+
+class LoanRequest(Request):
+    """Request that lifts the upload size cap for the streaming ingestion endpoint"""
+    
+    @property
+    def max_content_length(self):
+        if self.endpoint == 'upload_stream':
+            return current_app.config['MAX_STREAM_CONTENT_LENGTH']
+        return super().max_content_length
+
 app = Flask(__name__)
+app.request_class = LoanRequest
 app.config['SECRET_KEY'] = 'your-secret-key-change-in-production'
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['UPLOAD_JOB_WORKERS'] = int(os.getenv('UPLOAD_JOB_WORKERS', 1))
+app.config['JOB_STATUS_MAX_AGE_HOURS'] = float(os.getenv('JOB_STATUS_MAX_AGE_HOURS', 168))
+app.config['MAX_STREAM_CONTENT_LENGTH'] = None  # No cap for streamed CSV ingestion
+app.config['STREAM_CHUNK_ROWS'] = int(os.getenv('STREAM_CHUNK_ROWS', 100000))
+app.config['PORTFOLIO_FOLDER'] = os.getenv('PORTFOLIO_FOLDER', 'portfolios')
+app.config['SCATTER_MAX_POINTS'] = int(os.getenv('SCATTER_MAX_POINTS', 5000))
+app.config['SCATTER_MODE'] = os.getenv('SCATTER_MODE', 'sample')  # 'sample' or 'density'
+app.config['SCATTER_DENSITY_BINS'] = int(os.getenv('SCATTER_DENSITY_BINS', 50))
+app.config['DASHBOARD_PAGE_SIZE'] = int(os.getenv('DASHBOARD_PAGE_SIZE', 50))
+app.config['DASHBOARD_MAX_PAGE_SIZE'] = int(os.getenv('DASHBOARD_MAX_PAGE_SIZE', 1000))
+app.config['EXPORT_CHUNK_ROWS'] = int(os.getenv('EXPORT_CHUNK_ROWS', 50000))
+app.config['MODEL_FOLDER'] = os.getenv('MODEL_FOLDER', 'models')
+app.config['MODEL_KEEP_VERSIONS'] = int(os.getenv('MODEL_KEEP_VERSIONS', 10))
+app.config['MODEL_TREES'] = int(os.getenv('MODEL_TREES', 100))
+app.config['MODEL_UPDATE_TREES'] = int(os.getenv('MODEL_UPDATE_TREES', 20))
+app.config['MODEL_MAX_TREES'] = int(os.getenv('MODEL_MAX_TREES', 500))
+app.config['MODEL_REPLAY_ROWS'] = int(os.getenv('MODEL_REPLAY_ROWS', 20000))
+app.config['INFERENCE_ENGINE'] = os.getenv('INFERENCE_ENGINE', 'compiled')  # 'compiled' or 'sklearn'
+app.config['COMPILED_MAX_ROWS'] = int(os.getenv('COMPILED_MAX_ROWS', 256))
+app.config['SCORE_MAX_LOANS'] = int(os.getenv('SCORE_MAX_LOANS', 1000))
+app.config['SCORE_CACHE_ROWS'] = int(os.getenv('SCORE_CACHE_ROWS', 200000))  # 0 disables the score cache
+app.config['CLUSTER_ALGORITHM'] = os.getenv('CLUSTER_ALGORITHM', 'kmeans')  # 'kmeans' or 'minibatch'
+app.config['CLUSTER_BATCH_SIZE'] = int(os.getenv('CLUSTER_BATCH_SIZE', 4096))
+# Threads for training, inference and clustering: the CPUs available to this
+# process split between the worker processes (gunicorn.conf.py sets ML_WORKER_PROCESSES)
+app.config['ML_N_JOBS'] = worker_n_jobs(os.getenv('ML_N_JOBS'), os.getenv('ML_WORKER_PROCESSES', 1))
+app.config['STORAGE_BACKEND'] = os.getenv('STORAGE_BACKEND', 's3')  # 's3', 'local' or 'memory'
+app.config['STORAGE_FOLDER'] = os.getenv('STORAGE_FOLDER', 'storage')
+app.config['S3_UPLOAD_WORKERS'] = int(os.getenv('S3_UPLOAD_WORKERS', 4))
+app.config['S3_UPLOAD_RETRIES'] = int(os.getenv('S3_UPLOAD_RETRIES', 3))
+app.config['TIMING_LOG'] = os.getenv('TIMING_LOG', '0') == '1'  # one JSON timing line per request and job
 
 # Ensure upload folder exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'incoming'), exist_ok=True)
+os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'outgoing'), exist_ok=True)
+
+# Hot-path timings and counters for /metrics, each worker's are summed through snapshot files
+metrics = Metrics(os.path.join(app.config['UPLOAD_FOLDER'], 'metrics'))
+metrics.declare('loan_http_request_seconds', 'histogram', 'Time to serve a request, including streamed response bodies')
+metrics.declare('loan_http_request_bytes_total', 'counter', 'Request body bytes received')
+metrics.declare('loan_http_response_bytes_total', 'counter', 'Response body bytes sent')
+metrics.declare('loan_stage_seconds', 'histogram', 'Time spent in request hot-path stages such as chart rendering')
+metrics.declare('loan_job_seconds', 'histogram', 'Background job run time')
+metrics.declare('loan_job_stage_seconds', 'histogram', 'Time spent in each pipeline stage of background jobs')
+metrics.declare('loan_job_loans_total', 'counter', 'Loans processed by background jobs')
+metrics.declare('loan_job_cached_loans_total', 'counter', 'Loans background jobs took from the score cache')
+metrics.declare('loan_scored_loans_total', 'counter', 'Loans scored in real time by POST /score')
+metrics.declare('loan_storage_put_seconds', 'histogram', 'Time to store an object in S3, retries included')
+metrics.declare('loan_storage_put_bytes_total', 'counter', 'Bytes stored in S3')
+metrics.declare('loan_score_cache_hits_total', 'counter', 'Score cache lookups that found the loan')
+metrics.declare('loan_score_cache_misses_total', 'counter', 'Score cache lookups that had to score the loan')
+metrics.declare('loan_score_cache_evictions_total', 'counter', 'Loans evicted from the score cache')
+metrics.declare('loan_score_cache_rows', 'gauge', 'Loans held in the score cache')
+metrics.declare('loan_chart_cache_hits_total', 'counter', 'Chart payloads served from the chart cache')
+metrics.declare('loan_chart_cache_misses_total', 'counter', 'Chart payloads rendered on a chart cache miss')
+
+def log_timing(event, **fields):
+    """Print a structured timing line when TIMING_LOG is enabled"""
+    if app.config['TIMING_LOG']:
+        print(json.dumps({'event': event, **fields}))
+
+@contextmanager
+def timed(stage):
+    """Time a request hot-path stage into /metrics and the request's timing log (also a decorator)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        metrics.observe('loan_stage_seconds', seconds, stage=stage)
+        if has_request_context():
+            stage_seconds = g.setdefault('stage_seconds', {})
+            stage_seconds[stage] = stage_seconds.get(stage, 0) + seconds
+
+def record_job_stage(job, stage, seconds):
+    metrics.observe('loan_job_stage_seconds', seconds, kind=job.kind, stage=stage)
+
+def record_job(job, seconds):
+    """Job run time, loans processed and cache hits for /metrics and the timing log"""
+    result = job.result or {}
+    loans = result.get('total_loans', result.get('training_rows'))
+    metrics.observe('loan_job_seconds', seconds, kind=job.kind, status=job.status)
+    if loans:
+        metrics.inc('loan_job_loans_total', loans, kind=job.kind)
+    if result.get('cached_loans'):
+        metrics.inc('loan_job_cached_loans_total', result['cached_loans'], kind=job.kind)
+    log_timing(
+        'job',
+        job_id=job.id,
+        kind=job.kind,
+        status=job.status,
+        seconds=round(seconds, 6),
+        loans=loans,
+        cached_loans=result.get('cached_loans'),
+        stages={stage['name']: stage['seconds'] for stage in job.stages}
+    )
+
+def record_storage_put(key, seconds, size, uploaded):
+    metrics.observe('loan_storage_put_seconds', seconds, backend='s3', result='ok' if uploaded else 'failed')
+    if uploaded:
+        metrics.inc('loan_storage_put_bytes_total', size, backend='s3')
+
+# Background queue for upload and retraining jobs
+job_queue = JobQueue(
+    os.path.join(app.config['UPLOAD_FOLDER'], 'jobs'),
+    max_workers=app.config['UPLOAD_JOB_WORKERS'],
+    max_age=app.config['JOB_STATUS_MAX_AGE_HOURS'] * 3600,
+    on_stage=record_job_stage,
+    on_finish=record_job
+)
+
+# Scored portfolios, shared between workers through memory-mapped column files
+portfolio_store = PortfolioStore(app.config['PORTFOLIO_FOLDER'])
+
+# Rendered chart payloads, memoized per portfolio
+chart_cache = ChartCache(portfolio_store)
+
+# Scores of recently seen loans, so loans re-sent unchanged skip inference
+score_cache = ScoreCache(app.config['SCORE_CACHE_ROWS'])
+
+@metrics.collector
+def collect_cache_metrics():
+    stats = score_cache.stats()
+    metrics.set('loan_score_cache_hits_total', stats['hits'])
+    metrics.set('loan_score_cache_misses_total', stats['misses'])
+    metrics.set('loan_score_cache_evictions_total', stats['evictions'])
+    metrics.set('loan_score_cache_rows', stats['rows'])
+    metrics.set('loan_chart_cache_hits_total', chart_cache.hits)
+    metrics.set('loan_chart_cache_misses_total', chart_cache.misses)
+
+# Versioned model artifacts, their plain numpy arrays are memory-mapped when loaded
+model_registry = ModelRegistry(app.config['MODEL_FOLDER'], keep_versions=app.config['MODEL_KEEP_VERSIONS'])
 
 # Flask-Login setup
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
-# AWS S3 Configuration
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-    region_name=os.getenv('AWS_REGION', 'us-east-1')
-)
+# AWS S3 configuration for the s3 storage backend, the client (and boto3) is created on first use
+s3_client = None
 BUCKET_NAME = os.getenv('S3_BUCKET_NAME', 'smart-loan-recovery')
 
+def reset_s3_client():
+    # A client created in the preloaded master holds pooled keep-alive
+    # connections; forked workers must open their own instead of sharing them
+    global s3_client
+    s3_client = None
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_s3_client)
+
 # Simple user model for admin login
 class User(UserMixin):
     def __init__(self, id):
@@ -59,88 +217,222 @@ def load_user(user_id):
 # Global variables for ML model and data
 ml_model = None
 scaler = None
-current_data = None
-clustering_results = None
+feature_pipeline = None
+clusterer = None
+compiled_forest = None
+model_version = None
+model_reload_lock = threading.Lock()
+
+def compile_forest(model, compiled=None):
+    """Compiled copy of a fitted forest for small batches (the saved copy if given), or None"""
+    if app.config['INFERENCE_ENGINE'] != 'compiled' or not hasattr(model, 'estimators_'):
+        return None
+    if compiled is not None:
+        return compiled
+    try:
+        return CompiledForest.from_model(model)
+    except ValueError as e:
+        print(f"Using sklearn inference: {e}")
+        return None
+
+def create_model():
+    """Unfitted recovery classifier"""
+    from sklearn.ensemble import RandomForestClassifier
+    return RandomForestClassifier(n_estimators=app.config['MODEL_TREES'], n_jobs=app.config['ML_N_JOBS'], random_state=42)
+
+def use_loaded_model(artifacts, metadata):
+    """Make a version loaded from the registry the one this process serves"""
+    global ml_model, scaler, feature_pipeline, clusterer, compiled_forest, model_version
+    model = artifacts['model']
+    # n_jobs belongs to this host, not to the machine that trained the model
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=app.config['ML_N_JOBS'])
+    # The compiled copy's node arrays are memory-mapped and shared between workers,
+    # the sklearn forest itself is private unless it was loaded before the fork
+    forest = compile_forest(model, artifacts.get('forest'))
+    
+    # Versions saved before the feature pipeline and clustering were
+    # persisted fit them on the data they score
+    ml_model, scaler, feature_pipeline, clusterer, compiled_forest = (
+        model, artifacts['scaler'], artifacts.get('features'), artifacts.get('clusterer'), forest
+    )
+    model_version = metadata['version']
+    print(f"Loaded model version {model_version}")
+
+def refresh_ml_model():
+    """Load the registry's current version if another worker has published a newer one"""
+    current = model_registry.current_version()
+    if current is None or current == model_version:
+        return
+    with model_reload_lock:
+        # Another request may have loaded it meanwhile
+        current = model_registry.current_version()
+        if current is None or current == model_version:
+            return
+        try:
+            loaded = model_registry.load(current)
+        except Exception as e:
+            print(f"Error loading model version {current}: {e}")
+            return
+        if loaded is not None:
+            use_loaded_model(*loaded)
 
 def initialize_ml_model():
     """Initialize or load the ML model"""
-    global ml_model, scaler
+    global ml_model, scaler, feature_pipeline, clusterer, compiled_forest, model_version
     
-    # Try to load existing model from S3
+    # Load the current version from the local model registry, fetching it from storage if needed
     try:
-        response = s3_client.get_object(Bucket=BUCKET_NAME, Key='models/loan_recovery_model.pkl')
-        model_data = response['Body'].read()
-        ml_model = pickle.loads(model_data)
-        
-        response = s3_client.get_object(Bucket=BUCKET_NAME, Key='models/scaler.pkl')
-        scaler_data = response['Body'].read()
-        scaler = pickle.loads(scaler_data)
-        print("Loaded existing model from S3")
-    except:
+        loaded = model_registry.load()
+        if loaded is None:
+            loaded = download_model_from_storage()
+        if loaded is None:
+            loaded = import_legacy_model()
+    except Exception as e:
+        print(f"Error loading model: {e}")
+        loaded = None
+    
+    if loaded is not None:
+        use_loaded_model(*loaded)
+    else:
         # Create new model if none exists
-        ml_model = RandomForestClassifier(n_estimators=100, random_state=42)
+        from sklearn.preprocessing import StandardScaler
+        
+        ml_model = create_model()
         scaler = StandardScaler()
+        feature_pipeline = None
+        clusterer = None
+        compiled_forest = None
+        model_version = None
         print("Created new ML model")
 
-def upload_to_s3(file_data, key):
-    """Upload file to S3"""
-    try:
-        s3_client.put_object(
-            Bucket=BUCKET_NAME,
-            Key=key,
-            Body=file_data
+def get_s3_client():
+    """Get the S3 client shared by requests and upload threads, creating it on first use"""
+    global s3_client
+    if s3_client is None:
+        import boto3
+        from botocore.config import Config
+        s3_client = boto3.client(
+            's3',
+            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+            region_name=os.getenv('AWS_REGION', 'us-east-1'),
+            config=Config(max_pool_connections=app.config['S3_UPLOAD_WORKERS'] + 10, tcp_keepalive=True)
         )
-        return True
-    except ClientError as e:
-        print(f"Error uploading to S3: {e}")
-        return False
+    return s3_client
 
-def download_from_s3(key):
-    """Download file from S3"""
-    try:
-        response = s3_client.get_object(Bucket=BUCKET_NAME, Key=key)
-        return response['Body'].read()
-    except ClientError as e:
-        print(f"Error downloading from S3: {e}")
-        return None
+def create_storage(backend):
+    """Storage backend for raw uploads, archived portfolios and model versions"""
+    if backend == 's3':
+        # Uploads run in the background, requests and jobs never wait on S3
+        return S3Storage(
+            get_s3_client,
+            BUCKET_NAME,
+            max_workers=app.config['S3_UPLOAD_WORKERS'],
+            max_retries=app.config['S3_UPLOAD_RETRIES'],
+            on_upload=record_storage_put
+        )
+    if backend == 'local':
+        return LocalStorage(app.config['STORAGE_FOLDER'])
+    if backend == 'memory':
+        return MemoryStorage()
+    raise ValueError(f'Unknown storage backend: {backend}')
+
+storage = create_storage(app.config['STORAGE_BACKEND'])
+
+def archive_portfolio(upload_id):
+    """Store gzipped copies of a stored portfolio's files in a remote backend"""
+    if not storage.remote:
+        return []
+    return [
+        storage.put_file(f'processed/{upload_id}/{os.path.basename(path)}', path, compress=True)
+        for path in portfolio_store.files(upload_id)
+    ]
+
+def archive_raw_upload(upload_id, path, filename):
+    """Hand an original upload over to storage, which deletes it once stored"""
+    outgoing_path = os.path.join(app.config['UPLOAD_FOLDER'], 'outgoing', f'{upload_id}.csv')
+    os.replace(path, outgoing_path)
+    return storage.put_file(f'raw/{filename}', outgoing_path, delete=True)
 
-def save_model_to_s3():
-    """Save ML model to S3"""
+def save_model(feature_columns, training_rows, accuracy, **extra):
+    """Save ML model as a new registry version and mirror it to a remote backend"""
+    global model_version
+    
     if ml_model and scaler:
-        model_bytes = pickle.dumps(ml_model)
-        scaler_bytes = pickle.dumps(scaler)
+        artifacts = {'model': ml_model, 'scaler': scaler}
+        if feature_pipeline is not None:
+            artifacts['features'] = feature_pipeline
+        if clusterer is not None:
+            artifacts['clusterer'] = clusterer
+        if compiled_forest is not None:
+            artifacts['forest'] = compiled_forest
+        metadata = model_registry.save(
+            artifacts,
+            feature_columns=feature_columns,
+            training_rows=training_rows,
+            accuracy=accuracy,
+            **extra
+        )
+        model_version = metadata['version']
         
-        upload_to_s3(model_bytes, 'models/loan_recovery_model.pkl')
-        upload_to_s3(scaler_bytes, 'models/scaler.pkl')
+        if storage.remote:
+            # CURRENT is only published once every version file is stored
+            uploads = [
+                storage.put_file(f'models/{model_version}/{os.path.basename(path)}', path)
+                for path in model_registry.files(model_version)
+            ]
+            storage.put_bytes('models/CURRENT', model_version.encode(), after=uploads)
 
-def preprocess_data(df):
-    """Preprocess the loan data"""
-    # Handle missing values only for numeric columns
-    numeric_columns = df.select_dtypes(include=[np.number]).columns
-    df[numeric_columns] = df[numeric_columns].fillna(df[numeric_columns].mean())
-    
-    # Convert categorical variables to numeric
-    if 'region' in df.columns:
-        df['region_encoded'] = pd.Categorical(df['region']).codes
-    
-    # Feature engineering
-    df['overdue_ratio'] = df['overdue_days'] / df['loan_amount']
-    df['credit_score_normalized'] = (df['credit_score'] - df['credit_score'].mean()) / df['credit_score'].std()
-    
-    # Select features for ML
-    feature_columns = ['loan_amount', 'overdue_days', 'credit_score', 'overdue_ratio', 'credit_score_normalized']
-    if 'region_encoded' in df.columns:
-        feature_columns.append('region_encoded')
+def download_model_from_storage():
+    """Install the current model version from storage into the local registry and load it"""
+    version = storage.get_bytes('models/CURRENT')
+    if version is None:
+        return None
     
-    return df, feature_columns
+    version = version.decode().strip()
+    metadata = model_registry.install(version, lambda name: storage.get_bytes(f'models/{version}/{name}'))
+    if metadata is None:
+        return None
+    return model_registry.load(version)
 
-def train_model(df, feature_columns):
-    """Train the ML model"""
-    global ml_model, scaler
-    
-    # Prepare features and target (assuming 'recovered' column exists or create synthetic target)
-    X = df[feature_columns]
+def read_legacy_model_file(name):
+    """Pickled model file from the model folder, or from storage"""
+    path = os.path.join(app.config['MODEL_FOLDER'], name)
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return f.read()
+    return storage.get_bytes(f'models/{name}')
+
+def import_legacy_model():
+    """Register pickled models saved before the model registry as a version"""
+    model_data = read_legacy_model_file('loan_recovery_model.pkl')
+    scaler_data = read_legacy_model_file('scaler.pkl')
+    if model_data is None or scaler_data is None:
+        return None
     
+    legacy_scaler = pickle.loads(scaler_data)
+    artifacts = {'model': pickle.loads(model_data), 'scaler': legacy_scaler}
+    model_registry.save(
+        artifacts,
+        feature_columns=getattr(legacy_scaler, 'feature_names_in_', []),
+        training_rows=0,
+        accuracy=None,
+        source='legacy pickle'
+    )
+    return model_registry.load()
+
+def preprocess_data(df, features=None):
+    """Preprocess the loan data with a fitted feature pipeline (the model's by default)"""
+    if features is None:
+        features = feature_pipeline
+    if features is None:
+        # Model saved without a feature pipeline: statistics of this batch, as before
+        features = FeaturePipeline().fit(df)
+    return features.transform(df)
+
+def add_training_target(df):
+    """Add the synthetic recovery target, returning it"""
     # Create synthetic target based on business rules
     # Higher credit score, lower overdue days, higher loan amount = more likely to recover
     df['recovery_score'] = (
@@ -149,88 +441,354 @@ def train_model(df, feature_columns):
         (df['loan_amount'] / df['loan_amount'].max()) * 0.3
     )
     df['recovered'] = (df['recovery_score'] > 0.5).astype(int)
+    return df['recovered']
+
+def train_model(df, feature_columns, features):
+    """Train the ML model from scratch on data preprocessed by a newly fitted feature pipeline"""
+    global ml_model, scaler, feature_pipeline, clusterer, compiled_forest
+    from sklearn.model_selection import train_test_split
     
-    y = df['recovered']
+    # Prepare features and target (assuming 'recovered' column exists or create synthetic target)
+    X = df[feature_columns]
+    y = add_training_target(df)
     
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
     # Scale features
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+    from sklearn.preprocessing import StandardScaler
+    new_scaler = StandardScaler()
+    X_train_scaled = new_scaler.fit_transform(X_train)
+    X_test_scaled = new_scaler.transform(X_test)
+    
+    # Train a fresh model, dropping any trees added by incremental updates
+    model = create_model()
+    model.fit(X_train_scaled, y_train)
+    accuracy = model.score(X_test_scaled, y_test)
     
-    # Train model
-    ml_model.fit(X_train_scaled, y_train)
+    # Clusters live in the scaled feature space, so they are refitted with the scaler
+    clusters = fit_clusterer(model, X_train_scaled, X_test_scaled)
     
-    # Save model
-    save_model_to_s3()
+    # Swap everything in together, requests keep using the current model meanwhile
+    forest = compile_forest(model)
+    ml_model, scaler, feature_pipeline, clusterer, compiled_forest = model, new_scaler, features, clusters, forest
     
-    return ml_model.score(X_test_scaled, y_test)
+    # Save model as a new registry version
+    save_model(feature_columns, len(X_train), accuracy, training='full')
+    
+    return accuracy
 
-def predict_loans(df, feature_columns):
-    """Make predictions on loan data"""
-    global ml_model, scaler
+def sample_training_history(columns, rows):
+    """Up to rows loans sampled from stored portfolios in proportion to their size, or None"""
+    portfolios = [meta for meta in portfolio_store.list() if meta['rows']]
+    total = sum(meta['rows'] for meta in portfolios)
+    if rows <= 0 or total == 0:
+        return None
     
-    if ml_model is None or scaler is None:
+    rng = np.random.default_rng(42)
+    samples = []
+    for meta in portfolios:
+        count = min(meta['rows'], round(rows * meta['rows'] / total))
+        if count == 0:
+            continue
+        positions = np.sort(rng.choice(meta['rows'], size=count, replace=False))
+        sample = portfolio_store.take(meta['upload_id'], columns, positions)
+        if sample is not None:
+            samples.append(sample)
+    
+    if not samples:
         return None
+    return pd.concat(samples, ignore_index=True)
+
+def update_model(df, feature_columns):
+    """Incrementally train the ML model on new loans plus a replay sample of stored ones"""
+    global ml_model, clusterer, compiled_forest
+    from sklearn.model_selection import train_test_split
     
     X = df[feature_columns]
-    X_scaled = scaler.transform(X)
+    # Stored derived features come from whichever pipeline scored each
+    # portfolio, so replayed loans are rebuilt from their raw columns
+    raw_columns = REQUIRED_COLUMNS + (['region'] if 'region_encoded' in feature_columns else [])
+    history = sample_training_history(raw_columns, app.config['MODEL_REPLAY_ROWS'])
+    if history is not None:
+        history, _ = preprocess_data(history)
+        X = pd.concat([X, history[feature_columns]], ignore_index=True)
+    y = add_training_target(X.copy())
+    
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    
+    # New trees must predict the same classes as the existing ones
+    if not np.array_equal(np.unique(y_train), ml_model.classes_):
+        raise ValueError('Incremental training needs loans of every recovery class, upload in train mode instead')
     
-    predictions = ml_model.predict(X_scaled)
-    probabilities = ml_model.predict_proba(X_scaled)
+    # The existing scaler is kept, so the current trees see the same feature space
+    X_train_scaled = scaler.transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+    
+    # Fit a copy and swap it in, requests keep using the current model meanwhile
+    base_version = model_version
+    model = copy.copy(ml_model)
+    model.estimators_ = list(ml_model.estimators_)
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + app.config['MODEL_UPDATE_TREES'])
+    model.fit(X_train_scaled, y_train)
+    
+    excess = len(model.estimators_) - app.config['MODEL_MAX_TREES']
+    if excess > 0:
+        del model.estimators_[:excess]
+    model.set_params(warm_start=False, n_estimators=len(model.estimators_))
+    
+    accuracy = model.score(X_test_scaled, y_test)
+    
+    # MiniBatchKMeans centroids follow the new loans, and the clusters are
+    # re-ranked by the updated model either way
+    clusters = clusterer
+    if clusters is not None:
+        clusters = copy.deepcopy(clusters)
+        limit_native_threads(app.config['ML_N_JOBS'])
+        clusters.partial_fit(X_train_scaled)
+        rank_clusters(clusters, model, X_test_scaled)
+    
+    forest = compile_forest(model)
+    ml_model, clusterer, compiled_forest = model, clusters, forest
+    save_model(feature_columns, len(X_train), accuracy, training='incremental', base_version=base_version)
+    
+    return accuracy
+
+def forest_predict_proba(model, forest, X):
+    """Forest probabilities, small batches through the compiled forest (same result bit for bit)"""
+    if forest is not None and len(X) <= app.config['COMPILED_MAX_ROWS']:
+        return forest.predict_proba(X)
+    return model.predict_proba(X)
+
+def lookup_cached_scores(df, feature_columns):
+    """Scores the cache holds for these loans under the current model and clusters"""
+    owner = (ml_model, clusterer)
+    return score_cache.lookup(owner, df[feature_columns].to_numpy(dtype=float), model_version)
+
+def cache_scores(cached, probabilities, clusters):
+    """Cache a batch's new scores, unless the model or clusters changed while it was scored"""
+    if cached.owner[0] is ml_model and cached.owner[1] is clusterer:
+        score_cache.store(cached, probabilities, clusters)
+
+def predict_loans(df, feature_columns, cached=None):
+    """Make predictions on loan data, only for the loans the score cache missed"""
+    model, forest = ml_model, compiled_forest
+    
+    if model is None or scaler is None:
+        return None
+    
+    X = df[feature_columns]
+    if cached is not None:
+        X = X[cached.missing]
+    
+    # One pass over the forest, labels are the most probable classes exactly as predict() picks them
+    probabilities = np.empty((0, len(model.classes_)))
+    if len(X):
+        X_scaled = scaler.transform(X)
+        probabilities = forest_predict_proba(model, forest, X_scaled)
+    if cached is not None:
+        probabilities = cached.merge(cached.probabilities, probabilities)
+    predictions = model.classes_.take(np.argmax(probabilities, axis=1))
     
     return predictions, probabilities
 
-def perform_clustering(df, feature_columns, n_clusters=3):
-    """Perform K-means clustering"""
+def rank_clusters(clusters, model, X_scaled, max_rows=20000):
+    """Order cluster IDs from lowest to highest risk by the model's recovery probabilities of (a sample of) X_scaled"""
+    step = max(1, (len(X_scaled) + max_rows - 1) // max_rows)
+    X_scaled = X_scaled[::step]
+    return clusters.rank(X_scaled, model.predict_proba(X_scaled)[:, 1])
+
+def fit_clusterer(model, X_scaled, X_rank=None):
+    """Fit the risk-ordered clustering model on scaled features, ranked on X_rank (default X_scaled)"""
+    # KMeans runs on OpenMP threads, which ignore n_jobs
+    limit_native_threads(app.config['ML_N_JOBS'])
+    clusters = RiskClusters(
+        n_clusters=3,
+        algorithm=app.config['CLUSTER_ALGORITHM'],
+        batch_size=app.config['CLUSTER_BATCH_SIZE']
+    )
+    return rank_clusters(clusters.fit(X_scaled), model, X_scaled if X_rank is None else X_rank)
+
+def score_loans(loans):
+    """Score a few loan dicts with the loaded model, for the real-time /score endpoint"""
+    # One consistent snapshot, even if a training job swaps the model meanwhile
+    model, model_scaler, features, clusters, forest = ml_model, scaler, feature_pipeline, clusterer, compiled_forest
+    
+    X = features.transform_records(loans, list(model_scaler.feature_names_in_))
+    # Same arithmetic as StandardScaler.transform
+    X_scaled = (X - model_scaler.mean_) / model_scaler.scale_
+    
+    probabilities = forest_predict_proba(model, forest, X_scaled)
+    predictions = model.classes_.take(np.argmax(probabilities, axis=1))
+    recovery_probabilities = probabilities[:, 1]
+    cluster_ids = clusters.predict(X_scaled)
+    
+    recommendations = recommendation_engine.expand(
+        recommendation_engine.set_ids(predictions, recovery_probabilities, cluster_ids)
+    )
+    return [
+        {
+            'prediction': prediction,
+            'probability': probability,
+            'recovery_label': label,
+            'cluster': cluster,
+            'recommendations': loan_recommendations
+        }
+        for prediction, probability, label, cluster, loan_recommendations in zip(
+            predictions.tolist(),
+            recovery_probabilities.tolist(),
+            get_recovery_labels(recovery_probabilities).tolist(),
+            cluster_ids.tolist(),
+            recommendations
+        )
+    ]
+
+def perform_clustering(df, feature_columns, cached=None):
+    """Assign loans the score cache missed to the persisted risk-ordered clusters"""
+    global clusterer
     X = df[feature_columns]
-    X_scaled = scaler.transform(X)
+    if cached is not None:
+        X = X[cached.missing]
+    
+    clusters = np.empty(0, dtype=np.intp)
+    if len(X):
+        X_scaled = scaler.transform(X)
+        if clusterer is None:
+            clusterer = fit_clusterer(ml_model, X_scaled)
+        limit_native_threads(app.config['ML_N_JOBS'])
+        clusters = clusterer.predict(X_scaled)
+    if cached is not None:
+        clusters = cached.merge(cached.clusters, clusters)
+    
+    return clusters, clusterer.cluster_centers_
+
+def is_model_trained():
+    """Check whether the loaded model and scaler have been fitted"""
+    return hasattr(ml_model, 'estimators_') and hasattr(scaler, 'mean_')
+
+def check_feature_columns(feature_columns):
+    """Get an error message if features don't match the trained model, else None"""
+    trained_columns = list(getattr(scaler, 'feature_names_in_', []))
+    if trained_columns != list(feature_columns):
+        return f'Data does not match the trained model features: expected {trained_columns}, got {feature_columns}'
+    return None
+
+def get_recovery_labels(probabilities):
+    """Map recovery probabilities to recovery labels"""
+    probabilities = np.asarray(probabilities)
+    return np.select(
+        [probabilities > 0.7, probabilities > 0.4],
+        ['Recoverable', 'Risky'],
+        default='Unrecoverable'
+    )
+
+def add_scores(df, predictions, probabilities, clusters):
+    """Add model scores, clusters and recovery labels to loan data"""
+    df['prediction'] = predictions
+    df['probability'] = probabilities[:, 1]  # Probability of recovery
+    df['cluster'] = clusters
     
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-    clusters = kmeans.fit_predict(X_scaled)
+    # Create labels
+    df['recovery_label'] = get_recovery_labels(df['probability'])
     
-    return clusters, kmeans.cluster_centers_
+    return df
 
-def get_recovery_recommendations(prediction, probability, cluster):
-    """Get recovery recommendations based on prediction and cluster"""
-    recommendations = []
-    
-    if prediction == 1 and probability > 0.8:
-        recommendations.extend([
+# Recommendation sets, evaluated column-wise by the recommendation engine
+recommendation_engine = RecommendationEngine(
+    base_rules=[
+        (lambda prediction, probability: (prediction == 1) & (probability > 0.8), [
             "Send gentle reminder via email/SMS",
             "Offer payment plan with 5% discount",
             "Schedule follow-up call within 3 days"
-        ])
-    elif prediction == 1 and probability > 0.6:
-        recommendations.extend([
+        ]),
+        (lambda prediction, probability: (prediction == 1) & (probability > 0.6), [
             "Send formal payment reminder",
             "Offer payment plan with 3% discount",
             "Schedule follow-up call within 7 days"
-        ])
-    elif prediction == 0 and probability < 0.4:
-        recommendations.extend([
+        ]),
+        (lambda prediction, probability: (prediction == 0) & (probability < 0.4), [
             "Initiate legal proceedings",
             "Send final demand notice",
             "Consider debt collection agency"
         ])
-    else:  # Risky cases
-        recommendations.extend([
-            "Send urgent payment reminder",
-            "Offer payment plan with 10% discount",
-            "Schedule immediate follow-up call",
-            "Consider restructuring the loan"
-        ])
-    
-    # Add cluster-specific recommendations
-    if cluster == 0:  # Low risk
-        recommendations.append("Standard recovery process")
-    elif cluster == 1:  # Medium risk
-        recommendations.append("Enhanced monitoring required")
-    else:  # High risk
-        recommendations.append("Aggressive recovery strategy needed")
-    
-    return recommendations
+    ],
+    # Risky cases
+    default_recommendations=[
+        "Send urgent payment reminder",
+        "Offer payment plan with 10% discount",
+        "Schedule immediate follow-up call",
+        "Consider restructuring the loan"
+    ],
+    # Cluster-specific recommendations: low, medium and high risk (cluster IDs are risk-ordered)
+    cluster_recommendations=[
+        "Standard recovery process",
+        "Enhanced monitoring required",
+        "Aggressive recovery strategy needed"
+    ]
+)
+
+def get_recovery_recommendations(prediction, probability, cluster):
+    """Get recovery recommendations based on prediction and cluster"""
+    return recommendation_engine.recommend(prediction, probability, cluster)
+
+def get_recommendation_set_ids(df):
+    """Get recommendation set IDs for every row of scored loan data"""
+    return recommendation_engine.set_ids(
+        df['prediction'].to_numpy(),
+        df['probability'].to_numpy(),
+        df['cluster'].to_numpy()
+    )
+
+def count_bytes(chunks, sent):
+    """Pass a streamed response body through, adding each chunk's size to sent[0]"""
+    try:
+        for chunk in chunks:
+            sent[0] += len(chunk.encode()) if isinstance(chunk, str) else len(chunk)
+            yield chunk
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close:
+            close()
+
+def record_request(labels, start, request_bytes, response_bytes, stage_seconds):
+    seconds = time.perf_counter() - start
+    metrics.observe('loan_http_request_seconds', seconds, **labels)
+    metrics.inc('loan_http_request_bytes_total', request_bytes, route=labels['route'])
+    metrics.inc('loan_http_response_bytes_total', response_bytes, route=labels['route'])
+    log_timing(
+        'request',
+        **labels,
+        seconds=round(seconds, 6),
+        request_bytes=request_bytes,
+        response_bytes=response_bytes,
+        stages={stage: round(stage_seconds[stage], 6) for stage in stage_seconds}
+    )
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.stage_seconds = {}
+
+@app.after_request
+def record_request_metrics(response):
+    # Labelled by route pattern rather than path, so upload IDs don't multiply the series
+    labels = {
+        'method': request.method,
+        'route': request.url_rule.rule if request.url_rule else 'unmatched',
+        'status': response.status_code
+    }
+    start = g.get('request_start', time.perf_counter())
+    stage_seconds = g.get('stage_seconds', {})
+    request_bytes = request.content_length or 0
+    
+    if response.content_length is None and not response.direct_passthrough:
+        # Streamed exports are timed and counted once the whole body has been sent
+        sent = [0]
+        response.response = count_bytes(response.response, sent)
+        response.call_on_close(lambda: record_request(labels, start, request_bytes, sent[0], stage_seconds))
+    else:
+        record_request(labels, start, request_bytes, response.content_length or 0, stage_seconds)
+    return response
 
 @app.route('/')
 def index():
@@ -263,83 +821,418 @@ def logout():
 def dashboard():
     return render_template('dashboard.html')
 
-@app.route('/upload', methods=['POST'])
-@login_required
-def upload_file():
+REQUIRED_COLUMNS = ['loan_amount', 'overdue_days', 'credit_score']
+
+# Explicit dtypes for chunked CSV ingestion, so every chunk parses identically
+LOAN_DTYPES = {
+    'loan_amount': 'float64',
+    'overdue_days': 'float64',
+    'credit_score': 'float64',
+    'region': 'object'
+}
+
+# Other columns (loan IDs, notes, ...) are read as strings: inferred per
+# chunk, a column could turn from numbers to text halfway through a file
+STREAM_DTYPES = defaultdict(lambda: 'object', LOAN_DTYPES)
+
+def check_loan_csv(path):
+    """Validate a saved CSV before queuing any work, returning an error response and deleting the file if invalid"""
+    try:
+        df = pd.read_csv(path, nrows=1)
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+        if missing_columns:
+            error = f'Missing required columns: {missing_columns}'
+        elif df.empty:
+            error = 'The file contains no loans'
+        else:
+            error = None
+    except pd.errors.EmptyDataError:
+        error = 'The file is empty'
+    except (pd.errors.ParserError, UnicodeDecodeError):
+        error = 'The file could not be read as CSV'
+    
+    if error:
+        os.remove(path)
+        return jsonify({'error': error}), 400
+    return None
+
+def save_uploaded_loans():
+    """Save the uploaded loan CSV to disk, returning (path, filename, error response)"""
     if 'file' not in request.files:
-        return jsonify({'error': 'No file uploaded'}), 400
+        return None, None, (jsonify({'error': 'No file uploaded'}), 400)
     
     file = request.files['file']
     if file.filename == '':
-        return jsonify({'error': 'No file selected'}), 400
+        return None, None, (jsonify({'error': 'No file selected'}), 400)
+    
+    if not file.filename.endswith('.csv'):
+        return None, None, (jsonify({'error': 'Invalid file format'}), 400)
+    
+    path = os.path.join(app.config['UPLOAD_FOLDER'], 'incoming', f'{uuid.uuid4().hex}.csv')
+    file.save(path)
     
-    if file and file.filename.endswith('.csv'):
-        # Read CSV
-        df = pd.read_csv(file)
+    error = check_loan_csv(path)
+    if error:
+        return None, None, error
+    
+    return path, secure_filename(file.filename), None
+
+def save_streamed_loans():
+    """Stream a raw CSV request body to disk, returning (path, filename, error response)"""
+    filename = secure_filename(request.args.get('filename', 'stream.csv'))
+    if not filename.endswith('.csv'):
+        return None, None, (jsonify({'error': 'Invalid file format'}), 400)
+    
+    path = os.path.join(app.config['UPLOAD_FOLDER'], 'incoming', f'{uuid.uuid4().hex}.csv')
+    with open(path, 'wb') as f:
+        while True:
+            block = request.stream.read(1024 * 1024)
+            if not block:
+                break
+            f.write(block)
+    
+    if os.path.getsize(path) == 0:
+        os.remove(path)
+        return None, None, (jsonify({'error': 'No file uploaded'}), 400)
+    
+    error = check_loan_csv(path)
+    if error:
+        return None, None, error
+    
+    return path, filename, None
+
+def read_loan_csv(path):
+    """Read a saved loan CSV"""
+    df = pd.read_csv(path)
+    
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f'Missing required columns: {missing_columns}')
+    if df.empty:
+        raise ValueError('The file contains no loans')
+    
+    return df
+
+def process_upload(job, path, filename, mode):
+    """Background job: parse, preprocess, optionally train, score and persist an upload"""
+    try:
+        refresh_ml_model()
+        with job.stage('parse'):
+            df = read_loan_csv(path)
         
-        # Validate required columns
-        required_columns = ['loan_amount', 'overdue_days', 'credit_score']
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        with job.stage('preprocess'):
+            # Training fits new feature statistics, updates and scoring reuse the model's
+            features = FeaturePipeline().fit(df) if mode == 'train' else None
+            df_processed, feature_columns = preprocess_data(df, features)
         
-        if missing_columns:
-            return jsonify({'error': f'Missing required columns: {missing_columns}'}), 400
+        if mode == 'train':
+            with job.stage('train'):
+                accuracy = train_model(df_processed, feature_columns, features)
+        else:
+            feature_error = check_feature_columns(feature_columns)
+            if feature_error:
+                raise ValueError(feature_error)
+            accuracy = None
+            if mode == 'update':
+                with job.stage('train'):
+                    accuracy = update_model(df_processed, feature_columns)
         
-        # Preprocess data
-        df_processed, feature_columns = preprocess_data(df)
+        with job.stage('cache'):
+            cached = lookup_cached_scores(df_processed, feature_columns)
         
-        # Train model
-        accuracy = train_model(df_processed, feature_columns)
+        with job.stage('predict'):
+            predictions, probabilities = predict_loans(df_processed, feature_columns, cached)
         
-        # Make predictions
-        predictions, probabilities = predict_loans(df_processed, feature_columns)
+        with job.stage('cluster'):
+            clusters, _ = perform_clustering(df_processed, feature_columns, cached)
         
-        # Perform clustering
-        clusters, centers = perform_clustering(df_processed, feature_columns)
+        with job.stage('cache'):
+            cache_scores(cached, probabilities, clusters)
         
-        # Add results to dataframe
-        df_processed['prediction'] = predictions
-        df_processed['probability'] = probabilities[:, 1]  # Probability of recovery
-        df_processed['cluster'] = clusters
+        df_processed = add_scores(df_processed, predictions, probabilities, clusters)
         
-        # Create labels
-        df_processed['recovery_label'] = df_processed['probability'].apply(
-            lambda x: 'Recoverable' if x > 0.7 else 'Risky' if x > 0.4 else 'Unrecoverable'
-        )
+        with job.stage('persist'):
+            # Store scored portfolio, remote archiving continues in the background
+            portfolio_store.save(job.id, df_processed)
+            get_aggregates(job.id, df_processed)
+            archive_portfolio(job.id)
+            archive_raw_upload(job.id, path, filename)
+            portfolio_store.set_latest(job.id)
+    except Exception:
+        # LATEST keeps pointing at the last complete portfolio
+        portfolio_store.delete(job.id)
+        raise
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+    
+    return {
+        'success': True,
+        'upload_id': job.id,
+        'mode': mode,
+        'model_version': model_version,
+        'accuracy': accuracy,
+        'total_loans': len(df_processed),
+        'cached_loans': cached.hit_count,
+        'recoverable': int((df_processed['prediction'] == 1).sum()),
+        'unrecoverable': int((df_processed['prediction'] == 0).sum())
+    }
+
+def process_stream_upload(job, path, filename):
+    """Background job: score a large CSV chunk by chunk with the loaded model"""
+    writer = None
+    total_loans = cached_loans = recoverable = unrecoverable = 0
+    
+    try:
+        refresh_ml_model()
+        with pd.read_csv(path, chunksize=app.config['STREAM_CHUNK_ROWS'], dtype=STREAM_DTYPES) as reader:
+            chunk_number = 0
+            while True:
+                with job.stage('parse'):
+                    df = next(reader, None)
+                    if df is None:
+                        break
+                    chunk_number += 1
+                    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+                    if missing_columns:
+                        raise ValueError(f'Missing required columns in chunk {chunk_number}: {missing_columns}')
+                    # A header-only file reads as one empty chunk
+                    if df.empty:
+                        continue
+                
+                with job.stage('preprocess'):
+                    df_processed, feature_columns = preprocess_data(df)
+                    feature_error = check_feature_columns(feature_columns)
+                    if feature_error:
+                        raise ValueError(feature_error)
+                
+                with job.stage('cache'):
+                    cached = lookup_cached_scores(df_processed, feature_columns)
+                
+                with job.stage('predict'):
+                    predictions, probabilities = predict_loans(df_processed, feature_columns, cached)
+                
+                with job.stage('cluster'):
+                    clusters, _ = perform_clustering(df_processed, feature_columns, cached)
+                
+                with job.stage('cache'):
+                    cache_scores(cached, probabilities, clusters)
+                
+                df_processed = add_scores(df_processed, predictions, probabilities, clusters)
+                
+                with job.stage('persist'):
+                    if writer is None:
+                        writer = portfolio_store.writer(job.id)
+                    writer.append(df_processed)
+                
+                total_loans += len(df_processed)
+                cached_loans += cached.hit_count
+                recoverable += int((df_processed['prediction'] == 1).sum())
+                unrecoverable += int((df_processed['prediction'] == 0).sum())
+                job.update_progress(chunks=chunk_number, rows=total_loans, cached_rows=cached_loans)
         
-        # Store data globally
-        global current_data, clustering_results
-        current_data = df_processed
-        clustering_results = {
-            'clusters': clusters,
-            'centers': centers,
-            'feature_columns': feature_columns
-        }
+        if writer is None:
+            raise ValueError('The file contains no loans')
         
-        # Save to S3
-        csv_data = df_processed.to_csv(index=False)
-        upload_to_s3(csv_data.encode(), f'processed/predictions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv')
+        with job.stage('persist'):
+            writer.close()
+            get_aggregates(job.id)
+            
+            # Archive scored portfolio and original file in the background
+            archive_portfolio(job.id)
+            archive_raw_upload(job.id, path, filename)
+            portfolio_store.set_latest(job.id)
+    except Exception:
+        # LATEST keeps pointing at the last complete portfolio
+        portfolio_store.delete(job.id)
+        raise
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+    
+    return {
+        'success': True,
+        'upload_id': job.id,
+        'mode': 'score',
+        'model_version': model_version,
+        'accuracy': None,
+        'total_loans': total_loans,
+        'cached_loans': cached_loans,
+        'recoverable': recoverable,
+        'unrecoverable': unrecoverable
+    }
+
+def process_retrain(job, path, mode):
+    """Background job: retrain the model on a saved CSV without scoring it"""
+    try:
+        refresh_ml_model()
+        with job.stage('parse'):
+            df = read_loan_csv(path)
         
-        # Save original file to S3
-        file.seek(0)
-        upload_to_s3(file.read(), f'raw/{secure_filename(file.filename)}')
+        with job.stage('preprocess'):
+            features = FeaturePipeline().fit(df) if mode == 'train' else None
+            df_processed, feature_columns = preprocess_data(df, features)
+            if mode == 'update':
+                feature_error = check_feature_columns(feature_columns)
+                if feature_error:
+                    raise ValueError(feature_error)
         
-        return jsonify({
-            'success': True,
-            'accuracy': accuracy,
-            'total_loans': len(df_processed),
-            'recoverable': int((df_processed['prediction'] == 1).sum()),
-            'unrecoverable': int((df_processed['prediction'] == 0).sum())
-        })
-    
-    return jsonify({'error': 'Invalid file format'}), 400
+        with job.stage('train'):
+            if mode == 'update':
+                accuracy = update_model(df_processed, feature_columns)
+            else:
+                accuracy = train_model(df_processed, feature_columns, features)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+    
+    return {
+        'success': True,
+        'accuracy': accuracy,
+        'training_rows': len(df_processed),
+        'feature_columns': feature_columns,
+        'model_version': model_version
+    }
 
-@app.route('/predictions')
+def job_accepted(job):
+    """Response for a queued job"""
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': url_for('get_job_status', job_id=job.id)
+    }), 202
+
+@app.route('/upload', methods=['POST'])
 @login_required
-def get_predictions():
-    if current_data is None:
-        return jsonify({'error': 'No data available'}), 400
+def upload_file():
+    # 'train' retrains the model on the upload before scoring it,
+    # 'update' adds trees fitted on it to the current model first,
+    # 'score' reuses the loaded model and only pays for prediction
+    mode = request.form.get('mode', 'train')
+    if mode not in ('train', 'update', 'score'):
+        return jsonify({'error': f'Invalid upload mode: {mode}'}), 400
+    
+    refresh_ml_model()
+    if mode in ('update', 'score') and not is_model_trained():
+        return jsonify({'error': 'No trained model available, upload in train mode first'}), 400
+    
+    path, filename, error = save_uploaded_loans()
+    if error:
+        return error
+    
+    job = job_queue.submit('upload', process_upload, path, filename, mode)
+    return job_accepted(job)
+
+@app.route('/upload/stream', methods=['POST'])
+@login_required
+def upload_stream():
+    """Queue chunked scoring of a raw CSV request body of any size"""
+    refresh_ml_model()
+    if not is_model_trained():
+        return jsonify({'error': 'No trained model available, upload in train mode first'}), 400
+    
+    path, filename, error = save_streamed_loans()
+    if error:
+        return error
+    
+    job = job_queue.submit('stream_upload', process_stream_upload, path, filename)
+    return job_accepted(job)
+
+@app.route('/retrain', methods=['POST'])
+@login_required
+def retrain_model():
+    """Queue a retraining job on an uploaded CSV without scoring it"""
+    # 'train' refits from scratch, 'update' trains the current model incrementally
+    mode = request.form.get('mode', 'train')
+    if mode not in ('train', 'update'):
+        return jsonify({'error': f'Invalid retrain mode: {mode}'}), 400
+    
+    refresh_ml_model()
+    if mode == 'update' and not is_model_trained():
+        return jsonify({'error': 'No trained model available, retrain in train mode first'}), 400
+    
+    path, filename, error = save_uploaded_loans()
+    if error:
+        return error
+    
+    job = job_queue.submit('retrain', process_retrain, path, mode)
+    return job_accepted(job)
+
+@app.route('/jobs/<job_id>')
+@login_required
+def get_job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
     
-    # Apply filters
+    return jsonify(job)
+
+def get_current_upload_id():
+    """Upload ID of the portfolio for this request (?upload_id=, latest by default)"""
+    return request.args.get('upload_id') or portfolio_store.latest_id()
+
+def get_current_data(upload_id=None):
+    """Get a scored portfolio as a memory-mapped DataFrame"""
+    try:
+        return portfolio_store.load(upload_id or get_current_upload_id())
+    except ValueError:
+        return None
+
+def get_aggregates(upload_id, df=None):
+    """Get the cached chart and summary aggregates of a portfolio, computing them once"""
+    aggregates = portfolio_store.load_aggregates(upload_id)
+    if aggregates is None:
+        if df is None:
+            df = portfolio_store.load(upload_id)
+        aggregates = compute_aggregates(df)
+        portfolio_store.save_aggregates(upload_id, aggregates)
+    return aggregates
+
+@app.route('/portfolios')
+@login_required
+def list_portfolios():
+    return jsonify({
+        'latest': portfolio_store.latest_id(),
+        'portfolios': [
+            {key: meta[key] for key in ('upload_id', 'rows', 'created_at')}
+            for meta in portfolio_store.list()
+        ]
+    })
+
+@app.route('/ready')
+def readiness():
+    # Readiness probe, no login: 503 until the model and scaler are in memory
+    refresh_ml_model()
+    status = {'ready': model_ready(), 'model_version': model_version, 'model_trained': is_model_trained()}
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route('/metrics')
+def prometheus_metrics():
+    # Prometheus scrape target, no login like /ready; covers every worker process
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/models')
+@login_required
+def list_models():
+    refresh_ml_model()
+    return jsonify({
+        'current': model_version,
+        'versions': model_registry.list()
+    })
+
+@app.route('/score_cache')
+@login_required
+def get_score_cache_stats():
+    # Hit rate of the loan score cache in this worker since it started
+    return jsonify(score_cache.stats())
+
+# Columns indexed for /predictions filters, and the filter query parameters
+FILTER_COLUMNS = ['region', 'overdue_days', 'loan_amount', 'credit_score']
+FILTER_PARAMS = ['region', 'min_overdue', 'max_overdue', 'min_amount', 'max_amount', 'min_credit', 'max_credit']
+
+def get_filter_positions(upload_id):
+    """Row positions matching the request's filter parameters, or None for all rows"""
     region_filter = request.args.get('region', '')
     min_overdue = request.args.get('min_overdue', 0, type=int)
     max_overdue = request.args.get('max_overdue', 999999, type=int)
@@ -348,52 +1241,147 @@ def get_predictions():
     min_credit = request.args.get('min_credit', 0, type=int)
     max_credit = request.args.get('max_credit', 999, type=int)
     
-    filtered_data = current_data.copy()
-    
-    if region_filter and 'region' in filtered_data.columns:
-        filtered_data = filtered_data[filtered_data['region'] == region_filter]
+    # Resolve filters on the cached sorted indexes instead of masking every column
+    filter_index = portfolio_store.filter_index(upload_id, FILTER_COLUMNS)
+    equals = []
+    if region_filter and 'region' in filter_index:
+        equals.append(('region', region_filter))
+    
+    return filter_index.select(
+        ranges=[
+            ('overdue_days', min_overdue, max_overdue),
+            ('loan_amount', min_amount, max_amount),
+            ('credit_score', min_credit, max_credit)
+        ],
+        equals=equals
+    )
+
+@app.route('/predictions')
+@login_required
+def get_predictions():
+    upload_id = get_current_upload_id()
+    current_data = get_current_data(upload_id)
+    if current_data is None:
+        return jsonify({'error': 'No data available'}), 400
     
-    filtered_data = filtered_data[
-        (filtered_data['overdue_days'] >= min_overdue) &
-        (filtered_data['overdue_days'] <= max_overdue) &
-        (filtered_data['loan_amount'] >= min_amount) &
-        (filtered_data['loan_amount'] <= max_amount) &
-        (filtered_data['credit_score'] >= min_credit) &
-        (filtered_data['credit_score'] <= max_credit)
-    ]
+    positions = get_filter_positions(upload_id)
+    filtered_data = current_data if positions is None else current_data.iloc[positions]
     
     # Convert to JSON for frontend
-    results = []
-    for _, row in filtered_data.iterrows():
-        recommendations = get_recovery_recommendations(
-            row['prediction'], 
-            row['probability'], 
-            row['cluster']
-        )
-        
-        results.append({
-            'loan_amount': float(row['loan_amount']),
-            'overdue_days': int(row['overdue_days']),
-            'credit_score': int(row['credit_score']),
-            'region': row.get('region', 'N/A'),
-            'prediction': int(row['prediction']),
-            'probability': float(row['probability']),
-            'recovery_label': row['recovery_label'],
-            'cluster': int(row['cluster']),
-            'recommendations': recommendations
-        })
+    recommendations = recommendation_engine.expand(get_recommendation_set_ids(filtered_data))
+    if 'region' in filtered_data.columns:
+        regions = filtered_data['region'].tolist()
+    else:
+        regions = ['N/A'] * len(filtered_data)
+    
+    columns = {
+        'loan_amount': filtered_data['loan_amount'].astype(float).tolist(),
+        'overdue_days': filtered_data['overdue_days'].astype(int).tolist(),
+        'credit_score': filtered_data['credit_score'].astype(int).tolist(),
+        'region': regions,
+        'prediction': filtered_data['prediction'].astype(int).tolist(),
+        'probability': filtered_data['probability'].astype(float).tolist(),
+        'recovery_label': filtered_data['recovery_label'].tolist(),
+        'cluster': filtered_data['cluster'].astype(int).tolist(),
+        'recommendations': recommendations
+    }
+    results = [dict(zip(columns, values)) for values in zip(*columns.values())]
     
     return jsonify(results)
 
-@app.route('/analytics')
+@app.route('/score', methods=['POST'])
 @login_required
-def get_analytics():
-    if current_data is None:
-        return jsonify({'error': 'No data available'}), 400
+def score():
+    """Score one loan (JSON object) or a small batch (list, or {"loans": [...]}) with the loaded model"""
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and isinstance(data.get('loans'), list):
+        loans = data['loans']
+    elif isinstance(data, dict):
+        loans = [data]
+    elif isinstance(data, list):
+        loans = data
+    else:
+        return jsonify({'error': 'Expected a loan object or a list of loans'}), 400
+    
+    if not loans:
+        return jsonify({'error': 'No loans provided'}), 400
+    if len(loans) > app.config['SCORE_MAX_LOANS']:
+        return jsonify({'error': f"At most {app.config['SCORE_MAX_LOANS']} loans per request, upload larger batches"}), 400
+    if not all(isinstance(loan, dict) for loan in loans):
+        return jsonify({'error': 'Every loan must be a JSON object'}), 400
+    
+    missing_columns = sorted({col for loan in loans for col in REQUIRED_COLUMNS if col not in loan})
+    if missing_columns:
+        return jsonify({'error': f'Missing required columns: {missing_columns}'}), 400
+    
+    refresh_ml_model()
+    if not is_model_trained():
+        return jsonify({'error': 'No trained model available, upload in train mode first'}), 400
+    if feature_pipeline is None or clusterer is None:
+        return jsonify({'error': 'The current model version has no saved feature pipeline or clusters, retrain it to enable scoring'}), 400
+    
+    try:
+        results = score_loans(loans)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid loan data: {e}'}), 400
+    metrics.inc('loan_scored_loans_total', len(results))
+    
+    return jsonify({'model_version': model_version, 'results': results})
+
+def cached_json_response(upload_id, name, render):
+    """JSON response served from the chart cache, answering If-None-Match with 304"""
+    body, etag = chart_cache.get(upload_id, name, render)
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+def build_credit_recovery_chart(df):
+    """Credit score vs recovery probability chart, sampled or binned above SCATTER_MAX_POINTS loans"""
+    title = 'Credit Score vs Recovery Probability'
+    total_loans = len(df)
+    max_points = app.config['SCATTER_MAX_POINTS']
+    
+    if total_loans > max_points and app.config['SCATTER_MODE'] == 'density':
+        x, y, counts = density_grid(
+            df['credit_score'].to_numpy(),
+            df['probability'].to_numpy(),
+            bins=app.config['SCATTER_DENSITY_BINS']
+        )
+        chart = go.Figure(go.Heatmap(x=x, y=y, z=counts, colorscale='Viridis', colorbar={'title': 'Loans'}))
+        chart.update_layout(
+            title=f'{title} (density of {total_loans:,} loans)',
+            xaxis_title='credit_score',
+            yaxis_title='probability'
+        )
+        return chart
+    
+    if total_loans > max_points:
+        positions = stratified_sample(df['recovery_label'].astype(str).to_numpy(), max_points)
+        df = df[['credit_score', 'probability', 'recovery_label']].iloc[positions]
+        title = f'{title} (sample of {len(positions):,} of {total_loans:,} loans)'
+    
+    return px.scatter(
+        df,
+        x='credit_score',
+        y='probability',
+        color='recovery_label',
+        title=title,
+        color_discrete_map={
+            'Recoverable': '#28a745',
+            'Risky': '#ffc107',
+            'Unrecoverable': '#dc3545'
+        }
+    )
+
+@timed('render_analytics')
+def render_analytics(upload_id, current_data):
+    """Render the analytics charts and summary as a JSON payload"""
+    aggregates = get_aggregates(upload_id)
     
     # Recovery rate by region
-    if 'region' in current_data.columns:
-        region_recovery = current_data.groupby('region')['prediction'].mean().reset_index()
+    if aggregates['region_recovery'] is not None:
+        region_recovery = pd.DataFrame(aggregates['region_recovery'])
         region_chart = px.bar(
             region_recovery, 
             x='region', 
@@ -406,10 +1394,7 @@ def get_analytics():
         region_chart = None
     
     # Recovery rate by overdue days
-    overdue_bins = pd.cut(current_data['overdue_days'], bins=5)
-    overdue_recovery = current_data.groupby(overdue_bins)['prediction'].mean().reset_index()
-    # Convert interval to string for JSON serialization
-    overdue_recovery['overdue_days'] = overdue_recovery['overdue_days'].astype(str)
+    overdue_recovery = pd.DataFrame(aggregates['overdue_recovery'])
     overdue_chart = px.line(
         overdue_recovery,
         x='overdue_days',
@@ -419,10 +1404,7 @@ def get_analytics():
     )
     
     # Recovery rate by loan amount
-    amount_bins = pd.cut(current_data['loan_amount'], bins=5)
-    amount_recovery = current_data.groupby(amount_bins)['prediction'].mean().reset_index()
-    # Convert interval to string for JSON serialization
-    amount_recovery['loan_amount'] = amount_recovery['loan_amount'].astype(str)
+    amount_recovery = pd.DataFrame(aggregates['amount_recovery'])
     amount_chart = px.bar(
         amount_recovery,
         x='loan_amount',
@@ -433,10 +1415,10 @@ def get_analytics():
     )
     
     # Recovery label distribution
-    label_dist = current_data['recovery_label'].value_counts()
+    label_dist = aggregates['label_distribution']
     label_chart = px.pie(
-        values=label_dist.values,
-        names=label_dist.index,
+        values=label_dist['counts'],
+        names=label_dist['labels'],
         title='Distribution of Recovery Predictions',
         color_discrete_map={
             'Recoverable': '#28a745',
@@ -446,43 +1428,24 @@ def get_analytics():
     )
     
     # Cluster distribution
-    cluster_dist = current_data['cluster'].value_counts()
+    cluster_dist = aggregates['cluster_distribution']
     cluster_chart = px.bar(
-        x=cluster_dist.index,
-        y=cluster_dist.values,
+        x=cluster_dist['clusters'],
+        y=cluster_dist['counts'],
         title='Customer Clusters Distribution',
-        color=cluster_dist.values,
+        color=cluster_dist['counts'],
         color_continuous_scale='Viridis'
     )
     
     # Credit score vs recovery probability
-    credit_recovery = px.scatter(
-        current_data,
-        x='credit_score',
-        y='probability',
-        color='recovery_label',
-        title='Credit Score vs Recovery Probability',
-        color_discrete_map={
-            'Recoverable': '#28a745',
-            'Risky': '#ffc107',
-            'Unrecoverable': '#dc3545'
-        }
-    )
+    credit_recovery = build_credit_recovery_chart(current_data)
     
     # Loan amount vs overdue days heatmap
-    heatmap_data = current_data.groupby([
-        pd.cut(current_data['loan_amount'], bins=5),
-        pd.cut(current_data['overdue_days'], bins=5)
-    ])['prediction'].mean().unstack()
-    
-    # Convert index and columns to strings for JSON serialization
-    heatmap_data.index = heatmap_data.index.astype(str)
-    heatmap_data.columns = heatmap_data.columns.astype(str)
-    
+    heatmap_data = aggregates['heatmap']
     heatmap_chart = px.imshow(
-        heatmap_data.values,
-        x=heatmap_data.columns,
-        y=heatmap_data.index,
+        np.array(heatmap_data['z'], dtype=float),
+        x=heatmap_data['x'],
+        y=heatmap_data['y'],
         title='Recovery Rate Heatmap: Loan Amount vs Overdue Days',
         color_continuous_scale='RdYlGn'
     )
@@ -498,101 +1461,104 @@ def get_analytics():
         'heatmap': heatmap_chart.to_json()
     }
     
-    # Enhanced summary statistics
-    summary = {
-        'total_loans': len(current_data),
-        'recoverable': int((current_data['prediction'] == 1).sum()),
-        'unrecoverable': int((current_data['prediction'] == 0).sum()),
-        'avg_probability': float(current_data['probability'].mean()),
-        'avg_overdue_days': float(current_data['overdue_days'].mean()),
-        'avg_loan_amount': float(current_data['loan_amount'].mean()),
-        'avg_credit_score': float(current_data['credit_score'].mean()),
-        'total_portfolio_value': float(current_data['loan_amount'].sum()),
-        'recoverable_value': float(current_data[current_data['prediction'] == 1]['loan_amount'].sum()),
-        'unrecoverable_value': float(current_data[current_data['prediction'] == 0]['loan_amount'].sum()),
-        'recovery_rate': float((current_data['prediction'] == 1).mean()),
-        'high_risk_loans': int((current_data['probability'] < 0.4).sum()),
-        'medium_risk_loans': int(((current_data['probability'] >= 0.4) & (current_data['probability'] < 0.7)).sum()),
-        'low_risk_loans': int((current_data['probability'] >= 0.7).sum())
-    }
+    return app.json.response({'charts': charts, 'summary': aggregates['summary']}).get_data()
+
+@app.route('/analytics')
+@login_required
+def get_analytics():
+    upload_id = get_current_upload_id()
+    current_data = get_current_data(upload_id)
+    if current_data is None or current_data.empty:
+        return jsonify({'error': 'No data available'}), 400
     
-    return jsonify({'charts': charts, 'summary': summary})
+    # The scatter settings change the payload, so they are part of the cache key
+    cache_name = f"analytics_{app.config['SCATTER_MODE']}_{app.config['SCATTER_MAX_POINTS']}_{app.config['SCATTER_DENSITY_BINS']}"
+    return cached_json_response(upload_id, cache_name, lambda: render_analytics(upload_id, current_data))
+
+def iter_excel_rows(current_data, positions, chunk_rows):
+    """Excel export rows, built per chunk from column arrays"""
+    for chunk in iter_chunks(current_data, positions, chunk_rows):
+        recommendations = recommendation_engine.join(get_recommendation_set_ids(chunk))
+        if 'region' in chunk.columns:
+            regions = chunk['region'].tolist()
+        else:
+            regions = ['N/A'] * len(chunk)
+        yield from zip(
+            chunk['loan_amount'].tolist(),
+            chunk['overdue_days'].tolist(),
+            chunk['credit_score'].tolist(),
+            regions,
+            chunk['recovery_label'].tolist(),
+            chunk['probability'].tolist(),
+            chunk['cluster'].tolist(),
+            recommendations
+        )
 
 @app.route('/export/<format>')
 @login_required
 def export_data(format):
+    upload_id = get_current_upload_id()
+    current_data = get_current_data(upload_id)
     if current_data is None:
         return jsonify({'error': 'No data available'}), 400
     
+    # Same filter parameters as /predictions, unfiltered exports keep every row
+    positions = None
+    if any(param in request.args for param in FILTER_PARAMS):
+        positions = get_filter_positions(upload_id)
+    chunk_rows = app.config['EXPORT_CHUNK_ROWS']
+    
     if format == 'csv':
-        # Export to CSV
-        csv_data = current_data.to_csv(index=False)
+        # Stream CSV chunk by chunk
         return Response(
-            csv_data,
+            iter_csv(current_data, positions, chunk_rows),
             mimetype='text/csv',
             headers={'Content-Disposition': 'attachment; filename=loan_predictions.csv'}
         )
     
     elif format == 'excel':
-        # Export to Excel
+        # Stream rows into a write-only workbook, spilling to a temporary file
+        headers = ['Loan Amount', 'Overdue Days', 'Credit Score', 'Region', 
+                  'Recovery Status', 'Probability', 'Cluster', 'Recommendations']
+        output = tempfile.TemporaryFile()
         try:
-            from io import BytesIO
-            import openpyxl
-            from openpyxl import Workbook
-            
-            # Create Excel file
-            output = BytesIO()
-            workbook = Workbook()
-            worksheet = workbook.active
-            worksheet.title = "Loan Predictions"
-            
-            # Add headers
-            headers = ['Loan Amount', 'Overdue Days', 'Credit Score', 'Region', 
-                      'Recovery Status', 'Probability', 'Cluster', 'Recommendations']
-            for col, header in enumerate(headers, 1):
-                worksheet.cell(row=1, column=col, value=header)
-            
-            # Add data
-            for row, (_, item) in enumerate(current_data.iterrows(), 2):
-                recommendations = get_recovery_recommendations(
-                    item['prediction'], item['probability'], item['cluster']
-                )
-                worksheet.cell(row=row, column=1, value=item['loan_amount'])
-                worksheet.cell(row=row, column=2, value=item['overdue_days'])
-                worksheet.cell(row=row, column=3, value=item['credit_score'])
-                worksheet.cell(row=row, column=4, value=item.get('region', 'N/A'))
-                worksheet.cell(row=row, column=5, value=item['recovery_label'])
-                worksheet.cell(row=row, column=6, value=item['probability'])
-                worksheet.cell(row=row, column=7, value=item['cluster'])
-                worksheet.cell(row=row, column=8, value='; '.join(recommendations))
-            
-            workbook.save(output)
-            output.seek(0)
-            
-            return Response(
-                output.getvalue(),
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                headers={'Content-Disposition': 'attachment; filename=loan_predictions.xlsx'}
-            )
+            write_excel(output, headers, iter_excel_rows(current_data, positions, chunk_rows), 'Loan Predictions')
         except ImportError:
+            output.close()
             return jsonify({'error': 'Excel export requires openpyxl package'}), 400
+        output.seek(0)
+        
+        return send_file(
+            output,
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            as_attachment=True,
+            download_name='loan_predictions.xlsx'
+        )
     
     elif format == 'json':
-        # Export to JSON
-        json_data = current_data.to_json(orient='records', indent=2)
+        # Stream a JSON array chunk by chunk
         return Response(
-            json_data,
+            iter_json(current_data, positions, chunk_rows),
             mimetype='application/json',
             headers={'Content-Disposition': 'attachment; filename=loan_predictions.json'}
         )
     
+    elif format == 'ndjson':
+        # Stream newline-delimited JSON, one loan per line
+        return Response(
+            iter_ndjson(current_data, positions, chunk_rows),
+            mimetype='application/x-ndjson',
+            headers={'Content-Disposition': 'attachment; filename=loan_predictions.ndjson'}
+        )
+    
     else:
         return jsonify({'error': 'Unsupported format'}), 400
 
 @app.route('/model_metrics')
 @login_required
 def get_model_metrics():
-    if current_data is None:
+    current_data = get_current_data()
+    if current_data is None or current_data.empty:
         return jsonify({'error': 'No data available'}), 400
     
     # Calculate model performance metrics
@@ -615,7 +1581,7 @@ def get_model_metrics():
             ml_model.feature_importances_
         ))
     
-    metrics = {
+    model_metrics = {
         'accuracy': report['accuracy'],
         'precision': report['weighted avg']['precision'],
         'recall': report['weighted avg']['recall'],
@@ -628,24 +1594,26 @@ def get_model_metrics():
         'negative_samples': int((y_true == 0).sum())
     }
     
-    return jsonify(metrics)
+    return jsonify(model_metrics)
 
 @app.route('/recommendations')
 @login_required
 def recommendations_page():
     return render_template('recommendations.html')
 
-@app.route('/dashboard_data')
-@login_required
-def get_dashboard_data():
-    if current_data is None:
-        return jsonify({'error': 'No data available'}), 400
+# Columns shown in the dashboard table, the default dashboard_data projection
+DASHBOARD_FIELDS = ['loan_amount', 'overdue_days', 'credit_score', 'region', 'recovery_label', 'probability', 'cluster']
+
+@timed('render_dashboard_charts')
+def render_dashboard_charts(upload_id):
+    """Render the dashboard summary and charts as a JSON payload"""
+    aggregates = get_aggregates(upload_id)
     
     # Basic charts (same as before)
-    label_dist = current_data['recovery_label'].value_counts()
+    label_dist = aggregates['label_distribution']
     recovery_chart = px.pie(
-        values=label_dist.values,
-        names=label_dist.index,
+        values=label_dist['counts'],
+        names=label_dist['labels'],
         title='Distribution of Recovery Predictions',
         color_discrete_map={
             'Recoverable': '#28a745',
@@ -654,19 +1622,16 @@ def get_dashboard_data():
         }
     )
     
-    cluster_dist = current_data['cluster'].value_counts()
+    cluster_dist = aggregates['cluster_distribution']
     cluster_chart = px.bar(
-        x=cluster_dist.index,
-        y=cluster_dist.values,
+        x=cluster_dist['clusters'],
+        y=cluster_dist['counts'],
         title='Customer Clusters Distribution',
-        color=cluster_dist.values,
+        color=cluster_dist['counts'],
         color_continuous_scale='Viridis'
     )
     
-    overdue_bins = pd.cut(current_data['overdue_days'], bins=5)
-    overdue_recovery = current_data.groupby(overdue_bins)['prediction'].mean().reset_index()
-    # Convert interval to string for JSON serialization
-    overdue_recovery['overdue_days'] = overdue_recovery['overdue_days'].astype(str)
+    overdue_recovery = pd.DataFrame(aggregates['overdue_recovery'])
     overdue_chart = px.line(
         overdue_recovery,
         x='overdue_days',
@@ -675,10 +1640,7 @@ def get_dashboard_data():
         markers=True
     )
     
-    amount_bins = pd.cut(current_data['loan_amount'], bins=5)
-    amount_recovery = current_data.groupby(amount_bins)['prediction'].mean().reset_index()
-    # Convert interval to string for JSON serialization
-    amount_recovery['loan_amount'] = amount_recovery['loan_amount'].astype(str)
+    amount_recovery = pd.DataFrame(aggregates['amount_recovery'])
     amount_chart = px.bar(
         amount_recovery,
         x='loan_amount',
@@ -689,28 +1651,9 @@ def get_dashboard_data():
     )
     
     # Summary statistics
-    summary = {
-        'total_loans': len(current_data),
-        'recoverable': int((current_data['prediction'] == 1).sum()),
-        'unrecoverable': int((current_data['prediction'] == 0).sum()),
-        'avg_probability': float(current_data['probability'].mean()),
-        'avg_overdue_days': float(current_data['overdue_days'].mean()),
-        'avg_loan_amount': float(current_data['loan_amount'].mean()),
-        'avg_credit_score': float(current_data['credit_score'].mean()),
-        'total_portfolio_value': float(current_data['loan_amount'].sum()),
-        'recoverable_value': float(current_data[current_data['prediction'] == 1]['loan_amount'].sum()),
-        'unrecoverable_value': float(current_data[current_data['prediction'] == 0]['loan_amount'].sum()),
-        'recovery_rate': float((current_data['prediction'] == 1).mean()),
-        'high_risk_loans': int((current_data['probability'] < 0.4).sum()),
-        'medium_risk_loans': int(((current_data['probability'] >= 0.4) & (current_data['probability'] < 0.7)).sum()),
-        'low_risk_loans': int((current_data['probability'] >= 0.7).sum())
-    }
-    
-    # Convert data to list of dictionaries for JSON
-    data_list = current_data.to_dict('records')
+    summary = aggregates['summary']
     
-    return jsonify({
-        'data': data_list,
+    return app.json.response({
         'summary': summary,
         'charts': {
             'recovery': recovery_chart.to_json(),
@@ -718,7 +1661,80 @@ def get_dashboard_data():
             'overdue': overdue_chart.to_json(),
             'amount': amount_chart.to_json()
         }
-    })
+    }).get_data()
+
+def parse_dashboard_page(current_data):
+    """Validate the offset, limit, fields, sort and order query parameters"""
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', app.config['DASHBOARD_PAGE_SIZE'], type=int)
+    if offset < 0 or limit < 1:
+        raise ValueError('offset must be >= 0 and limit must be >= 1')
+    limit = min(limit, app.config['DASHBOARD_MAX_PAGE_SIZE'])
+    
+    if request.args.get('fields'):
+        fields = [field.strip() for field in request.args['fields'].split(',') if field.strip()]
+    else:
+        fields = [field for field in DASHBOARD_FIELDS if field in current_data.columns]
+    unknown = [field for field in fields if field not in current_data.columns]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    
+    sort = request.args.get('sort') or None
+    if sort is not None and sort not in current_data.columns:
+        raise ValueError(f'Unknown sort field: {sort}')
+    order = request.args.get('order', 'asc')
+    if order not in ('asc', 'desc'):
+        raise ValueError("order must be 'asc' or 'desc'")
+    
+    return {'offset': offset, 'limit': limit, 'fields': fields, 'sort': sort, 'order': order}
+
+def get_dashboard_page(upload_id, current_data, page):
+    """One page of projected dashboard records, sorted server-side"""
+    start, stop = page['offset'], page['offset'] + page['limit']
+    if page['sort'] is None:
+        rows = current_data.iloc[start:stop]
+    else:
+        positions = portfolio_store.sort_order(upload_id, page['sort'])
+        if page['order'] == 'desc':
+            positions = positions[::-1]
+        rows = current_data.iloc[positions[start:stop]]
+    
+    total = len(current_data)
+    return {
+        'data': rows[page['fields']].to_dict('records'),
+        'total': total,
+        'offset': page['offset'],
+        'limit': page['limit'],
+        'next_offset': stop if stop < total else None,
+        'fields': page['fields'],
+        'sort': page['sort'],
+        'order': page['order']
+    }
+
+@app.route('/dashboard_data')
+@login_required
+def get_dashboard_data():
+    upload_id = get_current_upload_id()
+    current_data = get_current_data(upload_id)
+    if current_data is None or current_data.empty:
+        return jsonify({'error': 'No data available'}), 400
+    
+    try:
+        page = parse_dashboard_page(current_data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    payload = get_dashboard_page(upload_id, current_data, page)
+    
+    # Table paging requests skip the (cached) summary and charts with charts=0
+    if request.args.get('charts', '1') != '0':
+        dashboard, _ = chart_cache.get_json(upload_id, 'dashboard_charts', lambda: render_dashboard_charts(upload_id))
+        payload.update(dashboard)
+    
+    response = jsonify(payload)
+    response.add_etag()
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
 
 @app.route('/recommendations', methods=['POST'])
 @login_required
@@ -768,6 +1784,16 @@ def get_loan_recommendations():
         }
     })
 
+def model_ready():
+    """Whether the model and scaler are loaded in this process"""
+    return ml_model is not None and scaler is not None
+
+def create_app():
+    """App factory for WSGI servers, loads the model before any request is served"""
+    if not model_ready():
+        initialize_ml_model()
+    return app
+
 if __name__ == '__main__':
-    initialize_ml_model()
+    create_app()
     app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
@@ -0,0 +1,113 @@
+"""Forest inference benchmark: compiled forest vs sklearn
+
+Trains a RandomForestClassifier like the app's on synthetic loan features,
+then times predict_proba through sklearn (single-threaded and on all
+available CPUs) and through forest_inference.CompiledForest for batch
+sizes from 1 row up to --max-rows, checking that the compiled output is
+bit-identical to sklearn's at every size.
+
+    python benchmarks/forest_inference.py [--max-rows 1000000] [--train-rows 200000] [--trees 100] [--runs 3] [--json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from sklearn.ensemble import RandomForestClassifier  # noqa: E402
+
+from forest_inference import CompiledForest  # noqa: E402
+from parallelism import available_cpus  # noqa: E402
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000, 1000000]
+
+
+def loan_features(rows, seed):
+    """Scaled loan-like features: amount, overdue days, credit score, ratio, normalized score, region"""
+    rng = np.random.default_rng(seed)
+    loan_amount = rng.lognormal(10.5, 0.8, rows)
+    overdue_days = rng.integers(0, 365, rows).astype(float)
+    credit_score = rng.normal(650, 80, rows).clip(300, 850)
+    region = rng.integers(0, 5, rows).astype(float)
+    X = np.column_stack([
+        loan_amount, overdue_days, credit_score, overdue_days / loan_amount,
+        (credit_score - 650) / 80, region
+    ])
+    recovery_score = (
+        credit_score / 850 * 0.4 + (1 - overdue_days / 365) * 0.3 +
+        loan_amount / loan_amount.max() * 0.3 + rng.normal(0, 0.05, rows)
+    )
+    X = (X - X.mean(axis=0)) / X.std(axis=0)
+    return X, (recovery_score > 0.5).astype(int)
+
+
+def median_seconds(func, runs, min_seconds=0.2):
+    # Repeat fast calls so each sample is long enough to time reliably
+    start = time.perf_counter()
+    func()
+    repeat = max(1, int(min_seconds / max(time.perf_counter() - start, 1e-6)))
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        samples.append((time.perf_counter() - start) / repeat)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-rows', type=int, default=1000000, help='largest batch size')
+    parser.add_argument('--train-rows', type=int, default=200000, help='rows the forest is trained on')
+    parser.add_argument('--trees', type=int, default=100, help='trees in the forest')
+    parser.add_argument('--runs', type=int, default=3, help='timed samples per batch size')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args()
+
+    X_train, y_train = loan_features(args.train_rows, seed=0)
+    model = RandomForestClassifier(n_estimators=args.trees, n_jobs=1, random_state=42).fit(X_train, y_train)
+    start = time.perf_counter()
+    forest = CompiledForest.from_model(model)
+    compile_seconds = time.perf_counter() - start
+
+    threaded = RandomForestClassifier(n_estimators=args.trees, random_state=42).set_params(n_jobs=available_cpus())
+    threaded.__dict__.update({key: value for key, value in model.__dict__.items() if key != 'n_jobs'})
+
+    X_test, _ = loan_features(args.max_rows, seed=1)
+    results = {
+        'trees': args.trees,
+        'nodes': int(len(forest.threshold)),
+        'max_depth': int(forest.max_depth),
+        'compile_ms': compile_seconds * 1000,
+        'cpus': available_cpus(),
+        'batches': {}
+    }
+    for rows in [size for size in BATCH_SIZES if size <= args.max_rows]:
+        X = X_test[:rows]
+        if not np.array_equal(forest.predict_proba(X), model.predict_proba(X)):
+            raise SystemExit(f'Compiled forest output differs from sklearn at {rows} rows')
+        results['batches'][rows] = {
+            'sklearn_ms': median_seconds(lambda: model.predict_proba(X), args.runs) * 1000,
+            'sklearn_threads_ms': median_seconds(lambda: threaded.predict_proba(X), args.runs) * 1000,
+            'compiled_ms': median_seconds(lambda: forest.predict_proba(X), args.runs) * 1000
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{results['trees']} trees, {results['nodes']:,} nodes, max depth {results['max_depth']}, "
+          f"compiled in {results['compile_ms']:.1f} ms; outputs bit-identical at every batch size")
+    print(f"{'rows':>9} {'sklearn':>12} {'sklearn x' + str(results['cpus']):>12} {'compiled':>12} {'speedup':>8}")
+    for rows, timings in results['batches'].items():
+        speedup = timings['sklearn_ms'] / timings['compiled_ms']
+        print(f"{rows:>9,} {timings['sklearn_ms']:>10.2f}ms {timings['sklearn_threads_ms']:>10.2f}ms "
+              f"{timings['compiled_ms']:>10.2f}ms {speedup:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Startup import-time benchmark
+
+Imports each app entry point in fresh interpreters with `-X importtime` and
+reports the median cumulative import time of the entry point and of each
+module it imports directly, plus the first-use cost of the dependencies the
+apps load lazily (paid by the first request that needs them).
+
+    python benchmarks/startup_imports.py [--runs 5] [--top 10] [--json]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_POINTS = ['app', 'app_local']
+LAZY_DEPENDENCIES = ['pandas', 'numpy', 'plotly.express', 'sklearn.ensemble', 'joblib', 'boto3']
+
+
+def import_times(module, workdir):
+    """Cumulative import times (ms) of module and its direct imports in a fresh interpreter"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True
+    )
+
+    # Lines are in completion order: a module's direct imports (indented one
+    # level) come right before its own top-level line
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            times[name.strip()] = int(cumulative) / 1000
+        elif depth == 0:
+            if name.strip() == module:
+                times[module] = int(cumulative) / 1000
+                return times
+            # Imported during interpreter startup, not by the module
+            times = {}
+    return times
+
+
+def median_times(module, runs, workdir):
+    samples = {}
+    for _ in range(runs):
+        for name, ms in import_times(module, workdir).items():
+            samples.setdefault(name, []).append(ms)
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per module')
+    parser.add_argument('--top', type=int, default=10, help='direct imports listed per entry point')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args()
+
+    # Importing the apps creates their data folders, keep them out of the repo
+    workdir = tempfile.mkdtemp(prefix='startup-imports-')
+    results = {'entry_points': {}, 'lazy_dependencies': {}}
+    for module in ENTRY_POINTS:
+        times = median_times(module, args.runs, workdir)
+        results['entry_points'][module] = {
+            'total_ms': times.pop(module),
+            'imports_ms': dict(sorted(times.items(), key=lambda item: item[1], reverse=True))
+        }
+    for module in LAZY_DEPENDENCIES:
+        results['lazy_dependencies'][module] = median_times(module, args.runs, workdir)[module]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for module, result in results['entry_points'].items():
+        print(f"{module}: {result['total_ms']:.1f} ms")
+        for name, ms in list(result['imports_ms'].items())[:args.top]:
+            print(f'    {name:<32} {ms:8.1f} ms')
+    print('first use of lazily imported dependencies:')
+    for module, ms in results['lazy_dependencies'].items():
+        print(f'    {module:<32} {ms:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Storage backend throughput benchmark
+
+Writes a file of random-ish CSV rows through each storage backend (plain and
+gzipped) and streams it back, reporting the median time of each operation.
+The in-memory backend isolates the app's own copy and compression cost from
+disk and network; pass --s3-bucket to include a real (or moto) S3 bucket.
+
+    python benchmarks/storage_backends.py [--size-mb 64] [--runs 3] [--s3-bucket NAME] [--json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import LocalStorage, MemoryStorage, S3Storage  # noqa: E402
+
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+def write_sample(path, size):
+    # Loan-like CSV rows, so gzip ratios resemble real uploads
+    row = 0
+    with open(path, 'w') as f:
+        f.write('loan_amount,overdue_days,credit_score,region\n')
+        while f.tell() < size:
+            f.write(f'{(row * 7919) % 500000 + 1000},{(row * 31) % 365},{300 + (row * 17) % 550},Region{row % 5}\n')
+            row += 1
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def stream(storage, key):
+    body = storage.open(key)
+    try:
+        while body.read(READ_BLOCK_SIZE):
+            pass
+    finally:
+        body.close()
+
+
+def measure(storage, path, runs):
+    samples = {}
+    for run in range(runs):
+        for compress in (False, True):
+            label = 'gzip' if compress else 'plain'
+            key = f'benchmark/{run}/sample.csv'
+            write = timed(lambda: storage.put_file(key, path, compress=compress) and storage.flush())
+            read = timed(lambda: stream(storage, f'{key}.gz' if compress else key))
+            samples.setdefault(f'put_file {label}', []).append(write)
+            samples.setdefault(f'open+read {label}', []).append(read)
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=64, help='size of the sample file')
+    parser.add_argument('--runs', type=int, default=3, help='repetitions per operation')
+    parser.add_argument('--s3-bucket', help='also benchmark this S3 bucket')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='storage-backends-')
+    path = os.path.join(workdir, 'sample.csv')
+    write_sample(path, args.size_mb * 1024 * 1024)
+    size_mb = os.path.getsize(path) / 1024 / 1024
+
+    backends = {'memory': MemoryStorage(), 'local': LocalStorage(os.path.join(workdir, 'local'))}
+    if args.s3_bucket:
+        import boto3
+        client = boto3.client('s3')
+        backends['s3'] = S3Storage(lambda: client, args.s3_bucket)
+
+    results = {name: measure(storage, path, args.runs) for name, storage in backends.items()}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f'{size_mb:.1f} MB sample, median of {args.runs} runs')
+    for name, timings in results.items():
+        print(f'{name}:')
+        for operation, seconds in timings.items():
+            print(f'    {operation:<20} {seconds * 1000:9.1f} ms  {size_mb / seconds:8.1f} MB/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Bump when chart rendering changes, so stale rendered payloads are ignored
+CHART_CACHE_VERSION = 1
+
+
+class ChartCache:
+    """Rendered chart payloads memoized per dataset version
+
+    Payloads are kept in an in-process LRU and written next to the
+    portfolio, so other workers and restarts reuse them too. Each payload
+    carries an ETag derived from its bytes.
+    """
+
+    def __init__(self, store, max_entries=32):
+        self.store = store
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._decoded = {}
+        self._lock = threading.Lock()
+
+    def get(self, upload_id, name, render):
+        """Get (payload bytes, etag), calling render() only on a miss"""
+        key = (upload_id, name)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        artifact_name = f'v{CHART_CACHE_VERSION}_{name}.json'
+        body = self.store.load_artifact(upload_id, artifact_name)
+        if body is None:
+            body = render()
+            self.store.save_artifact(upload_id, artifact_name, body)
+            with self._lock:
+                self.misses += 1
+        else:
+            with self._lock:
+                self.hits += 1
+
+        entry = (body, hashlib.sha1(body).hexdigest())
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._decoded.pop(evicted_key, None)
+        return entry
+
+    def get_json(self, upload_id, name, render):
+        """Get (decoded payload, etag), decoding each cached payload only once"""
+        body, etag = self.get(upload_id, name, render)
+        key = (upload_id, name)
+        with self._lock:
+            decoded = self._decoded.get(key)
+        if decoded is None or decoded[1] != etag:
+            decoded = (json.loads(body), etag)
+            with self._lock:
+                self._decoded[key] = decoded
+        return decoded
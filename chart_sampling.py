@@ -0,0 +1,35 @@
+from lazy_imports import LazyModule
+
+np = LazyModule('numpy')
+
+
+def stratified_sample(labels, max_points, random_state=42):
+    """Row positions of a sample with at most max_points rows, stratified by label
+
+    Each label keeps its share of the rows (at least one row per label), and
+    the positions are returned in their original order.
+    """
+    labels = np.asarray(labels)
+    if len(labels) <= max_points:
+        return np.arange(len(labels))
+
+    rng = np.random.default_rng(random_state)
+    values, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    quotas = np.maximum(1, np.floor(counts * max_points / len(labels)).astype(int))
+
+    positions = []
+    for label_index, quota in enumerate(quotas):
+        members = np.flatnonzero(inverse == label_index)
+        positions.append(rng.choice(members, size=min(quota, len(members)), replace=False))
+    return np.sort(np.concatenate(positions))
+
+
+def density_grid(x, y, bins=50):
+    """2D histogram of x/y as (x bin centers, y bin centers, counts[y][x])"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    counts, x_edges, y_edges = np.histogram2d(x[valid], y[valid], bins=bins)
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+    return x_centers, y_centers, counts.T
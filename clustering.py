@@ -0,0 +1,75 @@
+from lazy_imports import LazyModule
+
+np = LazyModule('numpy')
+
+ALGORITHMS = ('kmeans', 'minibatch')
+
+
+class RiskClusters:
+    """Persisted loan clustering whose cluster IDs are ordered by risk
+
+    Wraps a KMeans or MiniBatchKMeans fitted on scaled features. After
+    fitting, rank() orders the clusters by the mean recovery probability of
+    the loans in them, so cluster 0 is always the lowest-risk group and the
+    last one the highest, whatever order the estimator found them in. New
+    loans are assigned to the stored centroids in a single pass.
+    """
+
+    def __init__(self, n_clusters=3, algorithm='kmeans', batch_size=4096, random_state=42):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f'Unknown clustering algorithm: {algorithm}')
+        self.n_clusters = n_clusters
+        self.algorithm = algorithm
+        self.batch_size = batch_size
+        self.random_state = random_state
+        self.estimator = None
+        # ranks[estimator label] -> risk-ordered cluster ID
+        self.ranks = np.arange(n_clusters)
+
+    def fit(self, X):
+        if self.algorithm == 'minibatch':
+            from sklearn.cluster import MiniBatchKMeans
+            self.estimator = MiniBatchKMeans(n_clusters=self.n_clusters, batch_size=self.batch_size,
+                                             n_init=3, random_state=self.random_state)
+        else:
+            from sklearn.cluster import KMeans
+            self.estimator = KMeans(n_clusters=self.n_clusters, random_state=self.random_state)
+        self.estimator.fit(X)
+        return self
+
+    def partial_fit(self, X):
+        """Move the centroids towards new loans (MiniBatchKMeans only)
+
+        Returns False, leaving the centroids as they are, for full KMeans.
+        """
+        if self.estimator is None:
+            self.fit(X)
+            return True
+        if not hasattr(self.estimator, 'partial_fit'):
+            return False
+        self.estimator.partial_fit(X)
+        return True
+
+    def rank(self, X, probabilities):
+        """Order cluster IDs by risk, given loans X and their recovery probabilities"""
+        labels = self.estimator.predict(X)
+        totals = np.bincount(labels, weights=probabilities, minlength=self.n_clusters)
+        counts = np.bincount(labels, minlength=self.n_clusters)
+        # Empty clusters rank as the riskiest
+        means = np.divide(totals, counts, out=np.zeros(self.n_clusters), where=counts > 0)
+        # Highest recovery probability first, stable for ties
+        order = np.argsort(-means, kind='stable')
+        self.ranks = np.empty(self.n_clusters, dtype=np.intp)
+        self.ranks[order] = np.arange(self.n_clusters)
+        return self
+
+    def predict(self, X):
+        """Risk-ordered cluster ID of every row"""
+        return self.ranks[self.estimator.predict(X)]
+
+    @property
+    def cluster_centers_(self):
+        # Centroids in risk order
+        centers = np.empty_like(self.estimator.cluster_centers_)
+        centers[self.ranks] = self.estimator.cluster_centers_
+        return centers
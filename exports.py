@@ -0,0 +1,66 @@
+def iter_chunks(df, positions=None, chunk_rows=50000):
+    """Yield row chunks of df (restricted to positions, if given) in order"""
+    total = len(df) if positions is None else len(positions)
+    for start in range(0, total, chunk_rows):
+        if positions is None:
+            yield df.iloc[start:start + chunk_rows]
+        else:
+            yield df.iloc[positions[start:start + chunk_rows]]
+
+
+def iter_csv(df, positions=None, chunk_rows=50000):
+    """Stream df as CSV, header first, one chunk of rows at a time"""
+    yield df.iloc[:0].to_csv(index=False)
+    for chunk in iter_chunks(df, positions, chunk_rows):
+        yield chunk.to_csv(index=False, header=False)
+
+
+def iter_json(df, positions=None, chunk_rows=50000):
+    """Stream df as an indented JSON array of records
+
+    The output is identical to df.to_json(orient='records', indent=2).
+    """
+    yield '['
+    first = True
+    for chunk in iter_chunks(df, positions, chunk_rows):
+        # Strip the chunk's own '[' and '\n]'
+        body = chunk.to_json(orient='records', indent=2)[1:-2]
+        yield body if first else ',' + body
+        first = False
+    # An empty array is '[\n\n]', like to_json
+    yield '\n\n]' if first else '\n]'
+
+
+def iter_ndjson(df, positions=None, chunk_rows=50000):
+    """Stream df as newline-delimited JSON, one record per line"""
+    for chunk in iter_chunks(df, positions, chunk_rows):
+        yield chunk.to_json(orient='records', lines=True)
+
+
+# Rows per worksheet in .xlsx files, including the header row
+EXCEL_MAX_ROWS = 1048576
+
+
+def write_excel(fileobj, headers, rows, title, max_rows=EXCEL_MAX_ROWS):
+    """Write rows to fileobj as a write-only (streaming) .xlsx workbook
+
+    Rows past the Excel row limit continue on extra sheets ("<title> 2",
+    ...), each with its own header row. Raises ImportError without openpyxl.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    worksheet = None
+    sheet_rows = max_rows
+    for row in rows:
+        if sheet_rows >= max_rows:
+            sheet_number = len(workbook.worksheets) + 1
+            worksheet = workbook.create_sheet(title if sheet_number == 1 else f'{title} {sheet_number}')
+            worksheet.append(headers)
+            sheet_rows = 1
+        worksheet.append(row)
+        sheet_rows += 1
+
+    if worksheet is None:
+        workbook.create_sheet(title).append(headers)
+    workbook.save(fileobj)
@@ -0,0 +1,81 @@
+from lazy_imports import LazyModule
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+
+BASE_FEATURES = ['loan_amount', 'overdue_days', 'credit_score', 'overdue_ratio', 'credit_score_normalized']
+
+
+class FeaturePipeline:
+    """Loan feature engineering with statistics fixed at training time
+
+    fit() records the training data's numeric fill values, credit score
+    mean and standard deviation, and region vocabulary. transform() applies
+    them to a batch of any size, so a loan gets the same features whether
+    it is scored alone or in a large file. On the training data itself the
+    features are the same as when they were computed per batch.
+    """
+
+    def __init__(self):
+        self.fill_values = {}
+        self.credit_score_mean = None
+        self.credit_score_std = None
+        # Sorted training regions, None if trained without a region column
+        self.regions = None
+
+    def fit(self, df):
+        numeric_columns = df.select_dtypes(include=[np.number]).columns
+        self.fill_values = {col: float(value) for col, value in df[numeric_columns].mean().items()}
+
+        # Statistics of the filled column, as the model saw it in training
+        credit_score = df['credit_score'].fillna(self.fill_values['credit_score'])
+        self.credit_score_mean = float(credit_score.mean())
+        self.credit_score_std = float(credit_score.std())
+
+        if 'region' in df.columns:
+            self.regions = list(pd.Categorical(df['region']).categories)
+        return self
+
+    def transform(self, df):
+        """Add the derived features to df in place, returns (df, feature_columns)"""
+        # Handle missing values only for numeric columns, columns unseen in training use the batch mean
+        numeric_columns = df.select_dtypes(include=[np.number]).columns
+        fill_values = {
+            col: self.fill_values[col] if col in self.fill_values else df[col].mean()
+            for col in numeric_columns
+        }
+        df[numeric_columns] = df[numeric_columns].fillna(fill_values)
+
+        # Regions missing from the training vocabulary are encoded as -1, like missing regions
+        if 'region' in df.columns:
+            df['region_encoded'] = pd.Categorical(df['region'], categories=self.regions).codes
+
+        df['overdue_ratio'] = df['overdue_days'] / df['loan_amount']
+        df['credit_score_normalized'] = (df['credit_score'] - self.credit_score_mean) / self.credit_score_std
+
+        feature_columns = list(BASE_FEATURES)
+        if 'region_encoded' in df.columns:
+            feature_columns.append('region_encoded')
+        return df, feature_columns
+
+    def transform_records(self, records, feature_columns):
+        """Feature matrix for a few loan dicts, without building a DataFrame
+
+        Gives the same values as transform() for the same loans. Missing
+        (None or NaN) numbers are filled with the training means; numbers
+        that aren't numeric raise ValueError.
+        """
+        columns = {}
+        for name in ('loan_amount', 'overdue_days', 'credit_score'):
+            values = np.array([np.nan if record.get(name) is None else float(record[name]) for record in records])
+            columns[name] = np.where(np.isnan(values), self.fill_values.get(name, np.nan), values)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            columns['overdue_ratio'] = columns['overdue_days'] / columns['loan_amount']
+        columns['credit_score_normalized'] = (columns['credit_score'] - self.credit_score_mean) / self.credit_score_std
+
+        if 'region_encoded' in feature_columns:
+            codes = {region: code for code, region in enumerate(self.regions or [])}
+            columns['region_encoded'] = np.array([codes.get(record.get('region'), -1) for record in records], dtype=float)
+
+        return np.column_stack([columns[name] for name in feature_columns])
@@ -0,0 +1,77 @@
+from lazy_imports import LazyModule
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+
+
+class FilterIndex:
+    """Sorted row-position indexes for filtering a portfolio without scanning it
+
+    Each indexed column keeps its row positions ordered by value (stable, so
+    equal values stay in row order) next to the sorted values. Range and
+    equality filters resolve to slices of those positions by binary search;
+    the most selective slice is then narrowed by the other filters, so the
+    DataFrame itself is never copied or masked as a whole.
+    """
+
+    def __init__(self, df, columns, orders=None):
+        # orders: optional precomputed {column: stable argsort of its values}
+        self.rows = len(df)
+        self._values = {}
+        self._keys = {}
+        self._orders = {}
+        self._categories = {}
+        for column in columns:
+            if column not in df.columns:
+                continue
+
+            values = df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Categorical columns are indexed by code
+                self._categories[column] = {value: code for code, value in enumerate(values.cat.categories)}
+                values = values.cat.codes
+            values = values.to_numpy()
+
+            order = (orders or {}).get(column)
+            if order is None:
+                order = np.argsort(values, kind='stable')
+            self._values[column] = values
+            self._keys[column] = values[order]
+            self._orders[column] = order
+
+    def __contains__(self, column):
+        return column in self._keys
+
+    def select(self, ranges=(), equals=()):
+        """Ascending row positions matching every filter, or None if all rows match
+
+        ranges: (column, low, high) with inclusive bounds
+        equals: (column, value)
+        """
+        bounds = list(ranges)
+        for column, value in equals:
+            if column in self._categories:
+                value = self._categories[column].get(value)
+                if value is None:
+                    return np.empty(0, dtype=np.intp)
+            bounds.append((column, value, value))
+
+        # Missing values sort last and never match a bounded range
+        slices = []
+        for column, low, high in bounds:
+            keys = self._keys[column]
+            start = np.searchsorted(keys, low, side='left')
+            stop = np.searchsorted(keys, high, side='right')
+            if stop - start < self.rows:
+                slices.append((stop - start, column, low, high, start, stop))
+
+        if not slices:
+            return None
+
+        slices.sort(key=lambda item: item[0])
+        _, column, _, _, start, stop = slices[0]
+        positions = np.sort(self._orders[column][start:stop])
+        for _, column, low, high, _, _ in slices[1:]:
+            values = self._values[column][positions]
+            positions = positions[(values >= low) & (values <= high)]
+        return positions
@@ -0,0 +1,135 @@
+from lazy_imports import LazyModule
+
+np = LazyModule('numpy')
+
+TREE_LEAF = -1
+
+
+class CompiledForest:
+    """A fitted RandomForestClassifier flattened into contiguous node arrays
+
+    Every tree's nodes are concatenated into one set of arrays (children,
+    split feature, threshold, leaf probabilities), and predict_proba walks
+    all trees for a block of rows at once with vectorized NumPy steps, one
+    per tree level, instead of one sklearn call per tree. Leaves point to
+    themselves, so rows that reach a leaf early just stay there.
+
+    Results are bit-identical to the forest's predict_proba (as computed
+    with n_jobs=1): inputs are cast to float32 like sklearn does, splits
+    compare in double precision, and the trees' leaf probabilities are
+    normalized and summed in the same order.
+
+    The arrays are plain NumPy, so the object can be saved with joblib and
+    memory-mapped read-only by every worker.
+    """
+
+    def __init__(self, children, feature, threshold, missing_left, is_leaf, leaf_values, roots, max_depth, classes):
+        self.children = children
+        self.feature = feature
+        self.threshold = threshold
+        self.missing_left = missing_left
+        self.is_leaf = is_leaf
+        self.leaf_values = leaf_values
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes_ = classes
+
+    @classmethod
+    def from_model(cls, model):
+        """Flatten a fitted single-output RandomForestClassifier"""
+        if getattr(model, 'n_outputs_', 1) != 1 or not hasattr(model, 'estimators_'):
+            raise ValueError('Only fitted single-output forest classifiers can be compiled')
+
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        node_counts = np.array([tree.node_count for tree in trees])
+        roots = np.concatenate([[0], np.cumsum(node_counts)[:-1]]).astype(np.intp)
+        total_nodes = int(node_counts.sum())
+
+        # children[node] = (left, right); a leaf's children are itself
+        children = np.empty((total_nodes, 2), dtype=np.intp)
+        feature = np.zeros(total_nodes, dtype=np.intp)
+        threshold = np.zeros(total_nodes)
+        missing_left = np.zeros(total_nodes, dtype=bool)
+        is_leaf = np.zeros(total_nodes, dtype=bool)
+        leaf_values = np.zeros((total_nodes, model.n_classes_))
+
+        for tree, root in zip(trees, roots):
+            nodes = slice(root, root + tree.node_count)
+            own = np.arange(root, root + tree.node_count)
+            leaf = tree.children_left == TREE_LEAF
+            children[nodes, 0] = np.where(leaf, own, tree.children_left + root)
+            children[nodes, 1] = np.where(leaf, own, tree.children_right + root)
+            feature[nodes] = np.where(leaf, 0, tree.feature)
+            threshold[nodes] = tree.threshold
+            if hasattr(tree, 'missing_go_to_left'):
+                missing_left[nodes] = tree.missing_go_to_left.astype(bool)
+            is_leaf[nodes] = leaf
+
+            # Normalized exactly like DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, :]
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            leaf_values[nodes] = proba / normalizer
+
+        return cls(
+            children=children,
+            feature=feature,
+            threshold=threshold,
+            missing_left=missing_left,
+            is_leaf=is_leaf,
+            leaf_values=leaf_values,
+            roots=roots,
+            max_depth=max(tree.max_depth for tree in trees),
+            classes=np.asarray(model.classes_)
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def predict_proba(self, X, block_elements=262144):
+        """Class probabilities, block_elements bounds the (rows x trees) work arrays"""
+        X = np.asarray(X, dtype=np.float32)
+        probabilities = np.empty((len(X), len(self.classes_)))
+        block_rows = max(1, block_elements // self.n_trees)
+        for start in range(0, len(X), block_rows):
+            block = X[start:start + block_rows]
+            probabilities[start:start + len(block)] = self._predict_block(block)
+        return probabilities
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def apply(self, X):
+        """Leaf node (index into the flattened arrays) of every row in every tree"""
+        X = np.asarray(X, dtype=np.float32)
+        return self._leaves(X.astype(np.float64))
+
+    def _predict_block(self, X):
+        leaves = self._leaves(X.astype(np.float64))
+        # Accumulated tree by tree, in the same order as sklearn
+        probabilities = np.zeros((len(X), len(self.classes_)))
+        for tree in range(self.n_trees):
+            probabilities += self.leaf_values[leaves[:, tree]]
+        probabilities /= self.n_trees
+        return probabilities
+
+    def _leaves(self, X):
+        # X: float32 values promoted to float64, as sklearn compares them
+        rows, n_features = X.shape
+        values = np.ascontiguousarray(X).ravel()
+        row_offsets = (np.arange(rows, dtype=np.intp) * n_features)[:, np.newaxis]
+        children = self.children.ravel()
+        has_missing = bool(np.isnan(values).any())
+
+        nodes = np.broadcast_to(self.roots, (rows, self.n_trees)).copy()
+        for level in range(self.max_depth):
+            split_values = values[row_offsets + self.feature[nodes]]
+            go_left = split_values <= self.threshold[nodes]
+            if has_missing:
+                go_left |= np.isnan(split_values) & self.missing_left[nodes]
+            nodes = children[2 * nodes + ~go_left]
+            # Stop as soon as every row has reached a leaf in every tree
+            if level % 4 == 3 and self.is_leaf[nodes].all():
+                break
+        return nodes
@@ -0,0 +1,28 @@
+# Gunicorn settings: gunicorn -c gunicorn.conf.py
+# APP_MODULE selects the entry point ('app' for S3, 'app_local' for local storage)
+import os
+import sys
+import multiprocessing
+
+wsgi_app = f"{os.getenv('APP_MODULE', 'app')}:create_app()"
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+
+# Workers split the CPUs between them for model training, inference and clustering
+os.environ.setdefault('ML_WORKER_PROCESSES', str(workers))
+
+# Load the app, and with it the model, once in the master before forking workers
+preload_app = True
+
+
+def when_ready(server):
+    server.log.info('Model preloaded, master ready to fork workers')
+
+
+def post_worker_init(worker):
+    # The factory already ran in the master, so this finds the model in memory
+    module = sys.modules[worker.wsgi.import_name]
+    if not module.model_ready():
+        module.initialize_ml_model()
+    worker.log.info(f'Worker {worker.pid} ready with model version {module.model_version}')
@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import uuid
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class Job:
+    """A queued unit of background work with per-stage timings"""
+
+    def __init__(self, kind, on_change=None, on_stage=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = 'queued'
+        self.stage_name = None
+        self.stages = []
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self._on_change = on_change
+        self._on_stage = on_stage
+
+    @contextmanager
+    def stage(self, name):
+        """Time a pipeline stage and record it on the job
+
+        Re-entering a stage (e.g. once per chunk) adds to its total time.
+        """
+        self.stage_name = name
+        self._changed()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            for stage in self.stages:
+                if stage['name'] == name:
+                    stage['seconds'] = round(stage['seconds'] + seconds, 6)
+                    break
+            else:
+                self.stages.append({'name': name, 'seconds': round(seconds, 6)})
+            self.stage_name = None
+            self._changed()
+            if self._on_stage:
+                self._on_stage(self, name, seconds)
+
+    def update_progress(self, **progress):
+        """Record progress counters such as processed chunks and rows"""
+        self.progress.update(progress)
+        self._changed()
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'stage': self.stage_name,
+            'stages': [dict(stage) for stage in self.stages],
+            'progress': dict(self.progress),
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+    def _changed(self):
+        if self._on_change:
+            self._on_change(self)
+
+
+class JobQueue:
+    """Local thread-pool job queue
+
+    Job state is kept in memory and mirrored to a JSON file per job in
+    status_dir, so any worker process can answer status polls. Status files
+    untouched for max_age seconds are deleted, checked at most hourly when
+    jobs are submitted.
+
+    on_stage(job, name, seconds) is called after every timed stage and
+    on_finish(job, seconds) when a job completes or fails, e.g. for metrics.
+    """
+
+    def __init__(self, status_dir, max_workers=1, max_jobs=200, max_age=7 * 24 * 3600, on_stage=None, on_finish=None):
+        self.status_dir = status_dir
+        self.max_jobs = max_jobs
+        self.max_age = max_age
+        self._pruned_at = 0
+        self.on_stage = on_stage
+        self.on_finish = on_finish
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='upload-job')
+        os.makedirs(status_dir, exist_ok=True)
+
+    def submit(self, kind, func, *args, **kwargs):
+        """Queue func(job, *args, **kwargs) and return the job immediately"""
+        job = Job(kind, on_change=self._write_status, on_stage=self.on_stage)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict_finished()
+        self._write_status(job)
+        self._executor.submit(self._run, job, func, args, kwargs)
+        self.prune_status_files()
+        return job
+
+    def get(self, job_id):
+        """Get job status as a dict, or None if the job is unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+
+        # Job may have been queued by another worker process
+        try:
+            with open(self._status_path(job_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def prune_status_files(self, interval=3600):
+        """Delete status files older than max_age, at most once per interval seconds"""
+        now = time.time()
+        if not self.max_age or now - self._pruned_at < interval:
+            return
+        self._pruned_at = now
+        for name in os.listdir(self.status_dir):
+            path = os.path.join(self.status_dir, name)
+            # Queued and running jobs rewrite their file on every change
+            try:
+                if now - os.path.getmtime(path) > self.max_age:
+                    os.remove(path)
+            except OSError:
+                continue
+
+    def _run(self, job, func, args, kwargs):
+        job.status = 'running'
+        job.started_at = datetime.now().isoformat()
+        job._changed()
+        start = time.perf_counter()
+        try:
+            job.result = func(job, *args, **kwargs)
+            job.status = 'completed'
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = 'failed'
+        job.finished_at = datetime.now().isoformat()
+        job._changed()
+        if self.on_finish:
+            try:
+                self.on_finish(job, time.perf_counter() - start)
+            except Exception:
+                traceback.print_exc()
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in ('completed', 'failed')]
+        while len(self._jobs) > self.max_jobs and finished:
+            self._jobs.pop(finished.pop(0))
+
+    def _status_path(self, job_id):
+        # Job IDs are hex UUIDs, never let anything else reach the filesystem
+        return os.path.join(self.status_dir, f'{uuid.UUID(hex=job_id).hex}.json')
+
+    def _write_status(self, job):
+        path = self._status_path(job.id)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(job.to_dict(), f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,27 @@
+import importlib
+
+
+class LazyModule:
+    """Stand-in for a module that is only imported on first attribute access
+
+    Keeps heavy dependencies (pandas, plotly, joblib, ...) out of the
+    startup path of routes that never touch them:
+
+        pd = LazyModule('pandas')
+        pd.read_csv(...)  # pandas is imported here
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        # Only called for attributes not set in __init__; the import lock
+        # makes concurrent first accesses safe
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f'<lazy module {self._name!r} ({state})>'
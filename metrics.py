@@ -0,0 +1,222 @@
+import os
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+METRIC_TYPES = ('counter', 'gauge', 'histogram')
+
+
+class Metrics:
+    """Counters, gauges and latency histograms in the Prometheus text format
+
+    Metrics are declared once with a type and help text, then updated with
+    label values. With a folder, each process writes a snapshot of its own
+    metrics there in the background (at most every flush_seconds) and
+    render() adds up the snapshots of all live processes, so a scrape covers
+    every gunicorn worker whichever one answers it. Gauges are summed too.
+    Snapshots of exited processes are dropped, which Prometheus handles as a
+    counter reset.
+    """
+
+    def __init__(self, folder=None, flush_seconds=1.0, buckets=DEFAULT_BUCKETS):
+        self.folder = folder
+        self.flush_seconds = flush_seconds
+        self.buckets = tuple(buckets)
+        self._types = {}
+        # (name, labels) -> number, or [bucket counts, sum, count] for histograms
+        self._values = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._flusher_pid = None
+        self._dirty = False
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+    def declare(self, name, metric_type, help_text):
+        if metric_type not in METRIC_TYPES:
+            raise ValueError(f'Unknown metric type: {metric_type}')
+        self._types[name] = (metric_type, help_text)
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._check_fork()
+            self._values[key] = self._values.get(key, 0) + amount
+            self._changed()
+
+    def set(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._check_fork()
+            self._values[key] = value
+            self._changed()
+
+    def observe(self, name, value, **labels):
+        """Add a value (e.g. seconds) to a histogram"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._check_fork()
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+            self._changed()
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def collector(self, func):
+        """Register func() to refresh values (e.g. cache stats) before every snapshot"""
+        self._collectors.append(func)
+        return func
+
+    def render(self):
+        """Metrics of every live process in the Prometheus text exposition format"""
+        snapshot = self._snapshot()
+        snapshots = [snapshot]
+        if self.folder:
+            self._write(snapshot)
+            snapshots = self._read_snapshots()
+
+        totals = {}
+        for entries in snapshots:
+            for name, labels, value in entries:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                if key not in totals:
+                    totals[key] = value
+                elif isinstance(value, list):
+                    total = totals[key]
+                    totals[key] = [[a + b for a, b in zip(total[0], value[0])], total[1] + value[1], total[2] + value[2]]
+                else:
+                    totals[key] += value
+
+        lines = []
+        for name, (metric_type, help_text) in self._types.items():
+            series = sorted((key[1], value) for key, value in totals.items() if key[0] == name)
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for labels, value in series:
+                if metric_type == 'histogram':
+                    lines.extend(self._histogram_lines(name, labels, value))
+                else:
+                    lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def _histogram_lines(self, name, labels, value):
+        bucket_counts, total, count = value
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, bucket_counts):
+            cumulative += bucket_count
+            yield f'{name}_bucket{format_labels(labels + (("le", format_value(bound)),))} {cumulative}'
+        yield f'{name}_bucket{format_labels(labels + (("le", "+Inf"),))} {count}'
+        yield f'{name}_sum{format_labels(labels)} {format_value(total)}'
+        yield f'{name}_count{format_labels(labels)} {count}'
+
+    def _key(self, name, labels):
+        if name not in self._types:
+            raise KeyError(f'Undeclared metric: {name}')
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def _check_fork(self):
+        # A forked worker starts from zero, its parent reports what it counted itself
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._values = {}
+
+    def _changed(self):
+        self._dirty = True
+        if self.folder and self._flusher_pid != self._pid:
+            self._flusher_pid = self._pid
+            threading.Thread(target=self._flush_periodically, name='metrics-flush', daemon=True).start()
+
+    def _snapshot(self):
+        for collect in self._collectors:
+            try:
+                collect()
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+        with self._lock:
+            self._check_fork()
+            self._dirty = False
+            return [
+                [name, [list(pair) for pair in labels], [list(value[0]), value[1], value[2]] if isinstance(value, list) else value]
+                for (name, labels), value in self._values.items()
+            ]
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            if self._dirty:
+                try:
+                    self._write(self._snapshot())
+                except OSError as e:
+                    print(f"Error writing metrics snapshot: {e}")
+
+    def _write(self, snapshot):
+        path = os.path.join(self.folder, f'{os.getpid()}.json')
+        # Per thread, the flusher and a scrape may write at the same time
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+
+    def _read_snapshots(self):
+        snapshots = []
+        for filename in os.listdir(self.folder):
+            pid, ext = os.path.splitext(filename)
+            if ext != '.json' or not pid.isdigit():
+                continue
+            path = os.path.join(self.folder, filename)
+            if not process_alive(int(pid)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def escape_label_value(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape_label_value(value)}"' for key, value in labels) + '}'
+
+
+def format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
@@ -0,0 +1,156 @@
+import os
+import json
+import uuid
+import shutil
+import threading
+from datetime import datetime
+
+from lazy_imports import LazyModule
+
+joblib = LazyModule('joblib')
+
+
+class ModelRegistry:
+    """Versioned model artifacts on local disk
+
+    Each version is a directory holding the fitted model and scaler as
+    uncompressed joblib files plus a meta.json (feature columns, training
+    rows, accuracy, timestamp). Saving never overwrites an existing version;
+    a CURRENT file names the version that is loaded at startup.
+    """
+
+    def __init__(self, root, keep_versions=10):
+        self.root = root
+        self.keep_versions = keep_versions
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def version_path(self, version):
+        if not version or os.sep in version or version.startswith('.'):
+            raise ValueError(f'Invalid model version: {version}')
+        return os.path.join(self.root, version)
+
+    def save(self, artifacts, feature_columns, training_rows, accuracy, **extra):
+        """Store fitted artifacts ({name: estimator}) as a new current version"""
+        version = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        path = self.version_path(version)
+        tmp_path = f'{path}.tmp'
+        os.makedirs(tmp_path)
+
+        files = {}
+        for name, artifact in artifacts.items():
+            files[name] = f'{name}.joblib'
+            # Uncompressed, so numpy arrays can be memory-mapped on load
+            joblib.dump(artifact, os.path.join(tmp_path, files[name]))
+
+        metadata = {
+            'version': version,
+            'files': files,
+            'feature_columns': list(feature_columns),
+            'training_rows': int(training_rows),
+            'accuracy': float(accuracy) if accuracy is not None else None,
+            'created_at': datetime.now().isoformat(),
+            **extra
+        }
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump(metadata, f)
+
+        os.replace(tmp_path, path)
+        self.set_current(version)
+        self._prune()
+        return metadata
+
+    def install(self, version, read_file):
+        """Copy a version in from another store, read_file(name) -> bytes or None
+
+        Returns the version's metadata, or None if it could not be read.
+        """
+        meta_bytes = read_file('meta.json')
+        if meta_bytes is None:
+            return None
+        metadata = json.loads(meta_bytes)
+
+        path = self.version_path(version)
+        tmp_path = f'{path}.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for file_name in list(metadata['files'].values()) + ['meta.json']:
+            data = meta_bytes if file_name == 'meta.json' else read_file(file_name)
+            if data is None:
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                return None
+            with open(os.path.join(tmp_path, file_name), 'wb') as f:
+                f.write(data)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+        self.set_current(version)
+        return metadata
+
+    def set_current(self, version):
+        tmp_path = os.path.join(self.root, 'CURRENT.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(self.root, 'CURRENT'))
+
+    def current_version(self):
+        """Version loaded at startup, or None if nothing was saved yet"""
+        try:
+            with open(os.path.join(self.root, 'CURRENT')) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def metadata(self, version):
+        """Version metadata, or None if the version doesn't exist"""
+        try:
+            with open(os.path.join(self.version_path(version), 'meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def list(self):
+        """Metadata of all stored versions, newest first"""
+        versions = [
+            self.metadata(name) for name in os.listdir(self.root)
+            if os.path.isdir(os.path.join(self.root, name)) and not name.endswith('.tmp')
+        ]
+        versions = [meta for meta in versions if meta]
+        return sorted(versions, key=lambda meta: meta['created_at'], reverse=True)
+
+    def files(self, version):
+        """Paths of all files making up a version"""
+        path = self.version_path(version)
+        return [os.path.join(path, name) for name in sorted(os.listdir(path))]
+
+    def load(self, version=None, mmap_mode='r'):
+        """Load a version (the current one by default) as ({name: estimator}, metadata)
+
+        Large numpy arrays are memory-mapped read-only from the joblib files.
+        scikit-learn trees copy their node arrays when unpickled, so a loaded
+        forest is still private to the process. Returns None if there is no
+        such version.
+        """
+        version = version or self.current_version()
+        if version is None:
+            return None
+        metadata = self.metadata(version)
+        if metadata is None:
+            return None
+
+        path = self.version_path(version)
+        artifacts = {
+            name: joblib.load(os.path.join(path, file_name), mmap_mode=mmap_mode)
+            for name, file_name in metadata['files'].items()
+        }
+        return artifacts, metadata
+
+    def _prune(self):
+        # Drop the oldest versions beyond keep_versions, never the current one
+        if not self.keep_versions:
+            return
+        with self._lock:
+            current = self.current_version()
+            for metadata in self.list()[self.keep_versions:]:
+                if metadata['version'] != current:
+                    shutil.rmtree(self.version_path(metadata['version']), ignore_errors=True)
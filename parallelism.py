@@ -0,0 +1,70 @@
+import os
+import math
+
+_native_thread_limit = None
+
+
+def available_cpus():
+    """CPUs this process may run on: its affinity mask, capped by a cgroup CPU quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+def cgroup_cpu_quota():
+    """CPU quota of the container in CPUs (cgroup v2 or v1), or None if unlimited"""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+            quota = int(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def worker_n_jobs(configured=None, processes=1):
+    """Threads one process may use for training, inference and clustering
+
+    configured: explicit thread count (ML_N_JOBS), used as-is when set
+    processes: worker processes sharing the CPUs (e.g. gunicorn workers),
+    which split them evenly so the machine isn't oversubscribed
+    """
+    if configured:
+        return max(1, int(configured))
+    return max(1, available_cpus() // max(1, int(processes)))
+
+
+def limit_native_threads(n_jobs):
+    """Cap the native thread pools (OpenMP, BLAS) loaded so far at n_jobs
+
+    KMeans and numpy parallelize in native code that ignores n_jobs. The
+    limit is process-wide rather than a context manager, so concurrent
+    requests can't restore each other's limits mid-call; call it right
+    before native-parallel work, once the libraries are loaded. Repeat
+    calls with the same limit are free.
+    """
+    global _native_thread_limit
+    if _native_thread_limit == n_jobs:
+        return
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(limits=n_jobs)
+    _native_thread_limit = n_jobs
@@ -0,0 +1,93 @@
+from lazy_imports import LazyModule
+
+pd = LazyModule('pandas')
+
+
+def _bins(values, bins=5):
+    """Equal-width bins of a column, none for an empty one (pd.cut can't bin it)"""
+    if values.empty:
+        return pd.Series(pd.Categorical([], categories=pd.IntervalIndex([])), index=values.index)
+    return pd.cut(values, bins=bins)
+
+
+def _mean(values):
+    # None rather than NaN for an empty portfolio, which isn't valid JSON
+    return float(values.mean()) if len(values) else None
+
+
+def _binned_recovery(binned, prediction, column):
+    """Mean prediction per bin, with interval labels as strings"""
+    recovery = prediction.groupby(binned, observed=False).mean()
+    return {
+        column: recovery.index.astype(str).tolist(),
+        'prediction': recovery.tolist()
+    }
+
+
+def compute_summary(df):
+    """Summary statistics for a scored portfolio"""
+    recoverable = df['prediction'] == 1
+    unrecoverable = df['prediction'] == 0
+    return {
+        'total_loans': len(df),
+        'recoverable': int(recoverable.sum()),
+        'unrecoverable': int(unrecoverable.sum()),
+        'avg_probability': _mean(df['probability']),
+        'avg_overdue_days': _mean(df['overdue_days']),
+        'avg_loan_amount': _mean(df['loan_amount']),
+        'avg_credit_score': _mean(df['credit_score']),
+        'total_portfolio_value': float(df['loan_amount'].sum()),
+        'recoverable_value': float(df['loan_amount'][recoverable].sum()),
+        'unrecoverable_value': float(df['loan_amount'][unrecoverable].sum()),
+        'recovery_rate': _mean(recoverable),
+        'high_risk_loans': int((df['probability'] < 0.4).sum()),
+        'medium_risk_loans': int(((df['probability'] >= 0.4) & (df['probability'] < 0.7)).sum()),
+        'low_risk_loans': int((df['probability'] >= 0.7).sum())
+    }
+
+
+def compute_aggregates(df):
+    """Compute every aggregate the analytics and dashboard charts need
+
+    The result is JSON-serializable, so it can be computed once when a
+    portfolio is scored and stored next to it.
+    """
+    prediction = df['prediction']
+
+    # Recovery rate by region
+    region_recovery = None
+    if 'region' in df.columns:
+        by_region = prediction.groupby(df['region'], observed=True).mean()
+        region_recovery = {
+            'region': by_region.index.tolist(),
+            'prediction': by_region.tolist()
+        }
+
+    # Overdue days and loan amount bins are shared with the heatmap
+    overdue_bins = _bins(df['overdue_days'])
+    amount_bins = _bins(df['loan_amount'])
+
+    heatmap_data = prediction.groupby([amount_bins, overdue_bins], observed=False).mean().unstack()
+
+    label_dist = df['recovery_label'].value_counts()
+    cluster_dist = df['cluster'].value_counts()
+
+    return {
+        'region_recovery': region_recovery,
+        'overdue_recovery': _binned_recovery(overdue_bins, prediction, 'overdue_days'),
+        'amount_recovery': _binned_recovery(amount_bins, prediction, 'loan_amount'),
+        'label_distribution': {
+            'labels': label_dist.index.astype(str).tolist(),
+            'counts': label_dist.tolist()
+        },
+        'cluster_distribution': {
+            'clusters': cluster_dist.index.tolist(),
+            'counts': cluster_dist.tolist()
+        },
+        'heatmap': {
+            'x': heatmap_data.columns.astype(str).tolist(),
+            'y': heatmap_data.index.astype(str).tolist(),
+            'z': heatmap_data.values.tolist()
+        },
+        'summary': compute_summary(df)
+    }
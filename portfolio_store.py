@@ -0,0 +1,344 @@
+import os
+import json
+import shutil
+import threading
+from datetime import datetime
+
+from filter_index import FilterIndex
+from lazy_imports import LazyModule
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+
+
+class PortfolioWriter:
+    """Append scored loan chunks to a portfolio as raw column files
+
+    Numeric and boolean columns are written as-is. String columns are
+    dictionary-encoded: int32 codes on disk plus a vocabulary in the
+    metadata (-1 for missing values).
+    """
+
+    def __init__(self, store, upload_id):
+        self.store = store
+        self.upload_id = upload_id
+        self.path = store.portfolio_path(upload_id) + '.tmp'
+        self.columns = None
+        self.rows = 0
+        self._vocabularies = {}
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.makedirs(self.path)
+
+    def append(self, df):
+        """Append a chunk of scored loans"""
+        if self.columns is None:
+            self.columns = [
+                {'name': col, 'dtype': self._column_dtype(df[col]), 'file': f'column_{i}.bin'}
+                for i, col in enumerate(df.columns)
+            ]
+        elif [col['name'] for col in self.columns] != list(df.columns):
+            raise ValueError(f'Chunk columns {list(df.columns)} do not match portfolio columns')
+
+        for col in self.columns:
+            values = self._encode(col, df[col['name']])
+            with open(os.path.join(self.path, col['file']), 'ab') as f:
+                f.write(np.ascontiguousarray(values).tobytes())
+
+        self.rows += len(df)
+
+    def close(self):
+        """Finish the portfolio, PortfolioStore.set_latest publishes it"""
+        self._sort_vocabularies()
+        metadata = {
+            'upload_id': self.upload_id,
+            'rows': self.rows,
+            'columns': self.columns or [],
+            'vocabularies': self._vocabularies,
+            'created_at': datetime.now().isoformat()
+        }
+        with open(os.path.join(self.path, 'meta.json'), 'w') as f:
+            json.dump(metadata, f)
+
+        final_path = self.store.portfolio_path(self.upload_id)
+        shutil.rmtree(final_path, ignore_errors=True)
+        os.replace(self.path, final_path)
+        return metadata
+
+    def abort(self):
+        """Discard a partially written portfolio"""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def _sort_vocabularies(self, block_rows=1000000):
+        # Sorted categories group and order like the original string columns
+        for col in self.columns or []:
+            vocabulary = self._vocabularies.get(col['name'])
+            if col['dtype'] != 'category' or not vocabulary or vocabulary == sorted(vocabulary):
+                continue
+
+            order = np.argsort(vocabulary, kind='stable')
+            # Last entry maps missing values (-1) to themselves
+            remap = np.empty(len(vocabulary) + 1, dtype=np.int32)
+            remap[order] = np.arange(len(vocabulary), dtype=np.int32)
+            remap[-1] = -1
+
+            codes = np.memmap(os.path.join(self.path, col['file']), dtype=np.int32, mode='r+')
+            for start in range(0, len(codes), block_rows):
+                codes[start:start + block_rows] = remap[codes[start:start + block_rows]]
+            codes.flush()
+            del codes
+            self._vocabularies[col['name']] = [vocabulary[i] for i in order]
+
+    def _column_dtype(self, series):
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            return series.dtype.str
+        return 'category'
+
+    def _encode(self, col, series):
+        if col['dtype'] != 'category':
+            return series.to_numpy(dtype=np.dtype(col['dtype']))
+
+        # Extend the vocabulary with values first seen in this chunk
+        vocabulary = self._vocabularies.setdefault(col['name'], [])
+        present = series.notna().to_numpy()
+        strings = series[present].astype(str)
+        known = set(vocabulary)
+        for value in pd.unique(strings):
+            if value not in known:
+                vocabulary.append(value)
+                known.add(value)
+
+        codes = np.full(len(series), -1, dtype=np.int32)
+        codes[present] = pd.Categorical(strings, categories=vocabulary).codes
+        return codes
+
+
+class PortfolioStore:
+    """Persistent columnar store for scored loan portfolios, keyed by upload ID
+
+    Portfolios are loaded lazily as DataFrames backed by read-only memory
+    maps, so every worker process shares the same page-cache copy.
+    """
+
+    def __init__(self, root, max_cached=2):
+        self.root = root
+        self.max_cached = max_cached
+        self._cache = {}
+        self._aggregates = {}
+        self._sort_orders = {}
+        self._filter_indexes = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def portfolio_path(self, upload_id):
+        if not upload_id or os.sep in upload_id or upload_id.startswith('.'):
+            raise ValueError(f'Invalid upload ID: {upload_id}')
+        return os.path.join(self.root, upload_id)
+
+    def writer(self, upload_id):
+        """Start writing a new portfolio"""
+        return PortfolioWriter(self, upload_id)
+
+    def save(self, upload_id, df):
+        """Write a whole scored DataFrame as a portfolio"""
+        writer = self.writer(upload_id)
+        try:
+            writer.append(df)
+        except Exception:
+            writer.abort()
+            raise
+        return writer.close()
+
+    def delete(self, upload_id):
+        """Remove a portfolio, finished or partially written, and its cached data"""
+        path = self.portfolio_path(upload_id)
+        shutil.rmtree(f'{path}.tmp', ignore_errors=True)
+        shutil.rmtree(path, ignore_errors=True)
+        with self._lock:
+            self._cache.pop(upload_id, None)
+            self._aggregates.pop(upload_id, None)
+            for cache in (self._sort_orders, self._filter_indexes):
+                for key in [key for key in cache if key[0] == upload_id]:
+                    del cache[key]
+
+    def set_latest(self, upload_id):
+        tmp_path = os.path.join(self.root, 'LATEST.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(upload_id)
+        os.replace(tmp_path, os.path.join(self.root, 'LATEST'))
+
+    def latest_id(self):
+        """ID of the most recently written portfolio, or None"""
+        try:
+            with open(os.path.join(self.root, 'LATEST')) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def metadata(self, upload_id):
+        """Portfolio metadata, or None if the portfolio doesn't exist"""
+        try:
+            with open(os.path.join(self.portfolio_path(upload_id), 'meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def list(self):
+        """Metadata of all stored portfolios, newest first"""
+        portfolios = [self.metadata(name) for name in os.listdir(self.root) if not name.endswith('.tmp')]
+        portfolios = [meta for meta in portfolios if meta]
+        return sorted(portfolios, key=lambda meta: meta['created_at'], reverse=True)
+
+    def files(self, upload_id):
+        """Paths of all files making up a portfolio (not its derived cache)"""
+        path = self.portfolio_path(upload_id)
+        return [
+            os.path.join(path, name) for name in sorted(os.listdir(path))
+            if os.path.isfile(os.path.join(path, name))
+        ]
+
+    def load(self, upload_id=None):
+        """Load a portfolio (the latest by default) as a memory-mapped DataFrame"""
+        upload_id = upload_id or self.latest_id()
+        if upload_id is None:
+            return None
+
+        with self._lock:
+            if upload_id in self._cache:
+                return self._cache[upload_id]
+
+        metadata = self.metadata(upload_id)
+        if metadata is None:
+            return None
+
+        df = self._map_columns(metadata)
+        with self._lock:
+            self._cache[upload_id] = df
+            while len(self._cache) > self.max_cached:
+                self._cache.pop(next(iter(self._cache)))
+        return df
+
+    def sort_order(self, upload_id, column, max_cached=16):
+        """Row positions of a portfolio in ascending order of one column, cached"""
+        key = (upload_id, column)
+        with self._lock:
+            if key in self._sort_orders:
+                return self._sort_orders[key]
+
+        values = self.load(upload_id)[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Vocabularies are sorted, so code order is value order
+            values = values.cat.codes
+        order = np.argsort(values.to_numpy(), kind='stable')
+
+        with self._lock:
+            self._sort_orders[key] = order
+            while len(self._sort_orders) > max_cached:
+                self._sort_orders.pop(next(iter(self._sort_orders)))
+        return order
+
+    def filter_index(self, upload_id, columns):
+        """FilterIndex over the given columns of a portfolio, built once and cached"""
+        key = (upload_id, tuple(columns))
+        with self._lock:
+            if key in self._filter_indexes:
+                return self._filter_indexes[key]
+
+        df = self.load(upload_id)
+        columns = [column for column in columns if column in df.columns]
+        orders = {column: self.sort_order(upload_id, column) for column in columns}
+        index = FilterIndex(df, columns, orders)
+
+        with self._lock:
+            self._filter_indexes[key] = index
+            while len(self._filter_indexes) > self.max_cached:
+                self._filter_indexes.pop(next(iter(self._filter_indexes)))
+        return index
+
+    def take(self, upload_id, columns, positions):
+        """Selected rows of some columns as an in-memory DataFrame
+
+        Reads only those rows from the column files and leaves the loaded
+        portfolio cache alone, for sampling across many portfolios.
+        Returns None if the portfolio or one of the columns doesn't exist.
+        """
+        metadata = self.metadata(upload_id)
+        if metadata is None:
+            return None
+
+        by_name = {col['name']: col for col in metadata['columns']}
+        if any(column not in by_name for column in columns):
+            return None
+
+        path = self.portfolio_path(upload_id)
+        data = {}
+        for column in columns:
+            col = by_name[column]
+            dtype = np.dtype(np.int32) if col['dtype'] == 'category' else np.dtype(col['dtype'])
+            values = np.memmap(os.path.join(path, col['file']), dtype=dtype, mode='r', shape=(metadata['rows'],))
+            values = np.array(values[positions])
+            if col['dtype'] == 'category':
+                values = pd.Categorical.from_codes(values, categories=metadata['vocabularies'].get(column, []))
+            data[column] = values
+        return pd.DataFrame(data)
+
+    def save_aggregates(self, upload_id, aggregates):
+        """Store precomputed aggregates next to a portfolio"""
+        path = os.path.join(self.portfolio_path(upload_id), 'aggregates.json')
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(aggregates, f)
+        os.replace(f'{path}.tmp', path)
+        with self._lock:
+            self._aggregates[upload_id] = aggregates
+
+    def load_aggregates(self, upload_id):
+        """Precomputed aggregates of a portfolio, or None if not computed yet"""
+        with self._lock:
+            if upload_id in self._aggregates:
+                return self._aggregates[upload_id]
+
+        try:
+            with open(os.path.join(self.portfolio_path(upload_id), 'aggregates.json')) as f:
+                aggregates = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # Portfolios never change once written, so aggregates stay valid
+        with self._lock:
+            self._aggregates[upload_id] = aggregates
+        return aggregates
+
+    def save_artifact(self, upload_id, name, data):
+        """Store derived bytes (e.g. rendered charts) next to a portfolio"""
+        cache_dir = os.path.join(self.portfolio_path(upload_id), 'cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        path = os.path.join(cache_dir, name)
+        with open(f'{path}.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(f'{path}.tmp', path)
+
+    def load_artifact(self, upload_id, name):
+        """Derived bytes stored next to a portfolio, or None"""
+        try:
+            with open(os.path.join(self.portfolio_path(upload_id), 'cache', name), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _map_columns(self, metadata):
+        path = self.portfolio_path(metadata['upload_id'])
+        rows = metadata['rows']
+        columns = {}
+        for col in metadata['columns']:
+            dtype = np.dtype(np.int32) if col['dtype'] == 'category' else np.dtype(col['dtype'])
+            if rows:
+                values = np.memmap(os.path.join(path, col['file']), dtype=dtype, mode='r', shape=(rows,))
+            else:
+                values = np.empty(0, dtype=dtype)
+
+            if col['dtype'] == 'category':
+                categories = metadata['vocabularies'].get(col['name'], [])
+                values = pd.Categorical.from_codes(values, categories=categories)
+            columns[col['name']] = values
+
+        # copy=False keeps each column backed by its memory map
+        return pd.DataFrame(columns, copy=False)
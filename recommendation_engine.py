@@ -0,0 +1,65 @@
+from lazy_imports import LazyModule
+
+np = LazyModule('numpy')
+
+
+class RecommendationEngine:
+    """Column-wise recovery recommendations
+
+    Every (base rule, cluster rule) combination is precomputed once as a
+    recommendation set. Whole prediction/probability/cluster columns are
+    mapped to set IDs with NumPy masks, and the IDs are only expanded into
+    lists or strings when the results are serialized.
+    """
+
+    def __init__(self, base_rules, default_recommendations, cluster_recommendations):
+        # base_rules: ordered (condition(predictions, probabilities) -> mask, recommendations)
+        # pairs, first match wins. cluster_recommendations: one entry per cluster ID,
+        # the last entry also covers every cluster ID outside that range.
+        self.base_rules = base_rules
+        self.base_sets = [list(recs) for _, recs in base_rules] + [list(default_recommendations)]
+        self.cluster_sets = list(cluster_recommendations)
+
+        self.recommendation_sets = [
+            tuple(base + [cluster_rec])
+            for base in self.base_sets
+            for cluster_rec in self.cluster_sets
+        ]
+        self._set_lists = [list(recs) for recs in self.recommendation_sets]
+        self._joined = {}
+
+    def set_ids(self, predictions, probabilities, clusters):
+        """Map prediction/probability/cluster columns to recommendation set IDs"""
+        predictions = np.asarray(predictions)
+        probabilities = np.asarray(probabilities)
+        clusters = np.asarray(clusters)
+
+        base_ids = np.select(
+            [condition(predictions, probabilities) for condition, _ in self.base_rules],
+            np.arange(len(self.base_rules)),
+            default=len(self.base_rules)
+        )
+
+        last_cluster = len(self.cluster_sets) - 1
+        cluster_ids = np.full(clusters.shape, last_cluster)
+        for cluster_id in range(last_cluster):
+            cluster_ids[clusters == cluster_id] = cluster_id
+
+        return base_ids * len(self.cluster_sets) + cluster_ids
+
+    def expand(self, set_ids):
+        """Expand set IDs into recommendation lists (shared, do not mutate)"""
+        set_lists = self._set_lists
+        return [set_lists[set_id] for set_id in np.asarray(set_ids).tolist()]
+
+    def join(self, set_ids, separator='; '):
+        """Expand set IDs into joined recommendation strings"""
+        if separator not in self._joined:
+            self._joined[separator] = [separator.join(recs) for recs in self.recommendation_sets]
+        joined = self._joined[separator]
+        return [joined[set_id] for set_id in np.asarray(set_ids).tolist()]
+
+    def recommend(self, prediction, probability, cluster):
+        """Recommendations for a single loan"""
+        set_id = self.set_ids([prediction], [probability], [cluster])[0]
+        return list(self.recommendation_sets[set_id])
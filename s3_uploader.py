@@ -0,0 +1,185 @@
+import io
+import os
+import gzip
+import time
+import shutil
+import tempfile
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from botocore.exceptions import ClientError
+
+from lazy_imports import LazyModule
+
+boto3_s3_transfer = LazyModule('boto3.s3.transfer')
+boto3_exceptions = LazyModule('boto3.exceptions')
+
+
+class S3Uploader:
+    """Background S3 persistence queue
+
+    Uploads run in a thread pool sharing one S3 client, so requests and jobs
+    return without waiting on S3 round trips. Bodies above the multipart
+    threshold go through boto3's managed multipart transfer, compressible
+    outputs can be gzipped on the way, and failed uploads (ClientError) are
+    retried with exponential backoff.
+
+    Every put returns a Future; flush() waits for everything queued so far,
+    which is what tests against a local S3 stand-in (e.g. moto) use.
+    on_upload(key, seconds, size, uploaded) is called after each upload,
+    retries included, e.g. for metrics.
+    """
+
+    def __init__(self, get_client, bucket, max_workers=4, max_retries=3, retry_delay=0.5,
+                 multipart_threshold=8 * 1024 * 1024, multipart_chunksize=8 * 1024 * 1024, on_upload=None):
+        self.get_client = get_client
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.multipart_threshold = multipart_threshold
+        self.multipart_chunksize = multipart_chunksize
+        self.on_upload = on_upload
+        self.stats = {'queued': 0, 'uploaded': 0, 'failed': 0, 'retries': 0, 'bytes': 0}
+        self._reported_failures = 0
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='s3-upload')
+
+    def put_bytes(self, key, data, compress=False, after=()):
+        """Queue an upload of in-memory bytes
+
+        after: futures that must succeed first, otherwise this upload is skipped
+        """
+        return self._submit(self._upload_bytes, key, data, compress, after)
+
+    def put_file(self, key, path, compress=False, delete=False, after=()):
+        """Queue an upload of a local file, streamed from disk
+
+        delete removes the file once it has been uploaded; a file that could
+        not be uploaded is kept.
+        """
+        return self._submit(self._upload_file, key, path, compress, delete, after)
+
+    def flush(self, timeout=None):
+        """Wait for every upload queued so far
+
+        Returns True if all of them succeeded, False on a timeout or if any
+        upload failed since the previous flush, even one that had already
+        finished when flush was called.
+        """
+        with self._lock:
+            pending = list(self._pending)
+        done, not_done = wait(pending, timeout=timeout)
+        with self._lock:
+            # Failures are counted before their future completes
+            failed = self.stats['failed'] - self._reported_failures
+            self._reported_failures = self.stats['failed']
+        return not not_done and not failed and all(future.result() for future in done)
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _submit(self, func, *args):
+        future = self._executor.submit(func, *args)
+        with self._lock:
+            self.stats['queued'] += 1
+            self._pending.add(future)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def _transfer_config(self):
+        return boto3_s3_transfer.TransferConfig(
+            multipart_threshold=self.multipart_threshold,
+            multipart_chunksize=self.multipart_chunksize,
+            use_threads=False
+        )
+
+    def _dependencies_ok(self, key, after):
+        # Dependencies were queued first, so they are already running or done
+        if all(future.result() for future in after):
+            return True
+        print(f"Skipping S3 upload of {key}: an upload it depends on failed")
+        self._count('failed')
+        return False
+
+    def _upload_bytes(self, key, data, compress, after):
+        if not self._dependencies_ok(key, after):
+            return False
+
+        extra_args = {}
+        if compress:
+            data = gzip.compress(data)
+            key, extra_args = f'{key}.gz', {'ContentEncoding': 'gzip'}
+
+        def upload():
+            if len(data) >= self.multipart_threshold:
+                self.get_client().upload_fileobj(io.BytesIO(data), self.bucket, key,
+                                                 ExtraArgs=extra_args, Config=self._transfer_config())
+            else:
+                self.get_client().put_object(Bucket=self.bucket, Key=key, Body=data, **extra_args)
+
+        return self._with_retries(key, upload, len(data))
+
+    def _upload_file(self, key, path, compress, delete, after):
+        if not self._dependencies_ok(key, after):
+            return False
+
+        source, extra_args = path, {}
+        try:
+            if compress:
+                # Compress to a temporary file so memory stays flat for large outputs
+                fd, source = tempfile.mkstemp(suffix='.gz')
+                with open(path, 'rb') as src, os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                key, extra_args = f'{key}.gz', {'ContentEncoding': 'gzip'}
+
+            def upload():
+                self.get_client().upload_file(source, self.bucket, key,
+                                              ExtraArgs=extra_args, Config=self._transfer_config())
+
+            uploaded = self._with_retries(key, upload, os.path.getsize(source))
+        finally:
+            if source != path and os.path.exists(source):
+                os.remove(source)
+
+        if uploaded and delete:
+            os.remove(path)
+        return uploaded
+
+    def _with_retries(self, key, upload, size):
+        start = time.perf_counter()
+        uploaded = self._attempt(key, upload, size)
+        if self.on_upload:
+            self.on_upload(key, time.perf_counter() - start, size, uploaded)
+        return uploaded
+
+    def _attempt(self, key, upload, size):
+        # upload_file/upload_fileobj wrap ClientError in S3UploadFailedError
+        retryable = (ClientError, boto3_exceptions.S3UploadFailedError)
+        for attempt in range(self.max_retries + 1):
+            try:
+                upload()
+                self._count('uploaded')
+                self._count('bytes', size)
+                return True
+            except retryable as e:
+                if attempt == self.max_retries:
+                    print(f"Error uploading {key} to S3 after {attempt + 1} attempts: {e}")
+                    self._count('failed')
+                    return False
+                self._count('retries')
+                time.sleep(self.retry_delay * 2 ** attempt)
+            except Exception:
+                traceback.print_exc()
+                self._count('failed')
+                return False
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
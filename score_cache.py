@@ -0,0 +1,172 @@
+import threading
+from collections import OrderedDict
+
+from lazy_imports import LazyModule
+
+np = LazyModule('numpy')
+
+
+def row_keys(X):
+    """Hashable key per row of a feature matrix: the raw bytes of its float64 values"""
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    if X.shape[0] == 0:
+        return []
+    return X.view(np.dtype((np.void, X.shape[1] * X.itemsize))).ravel().tolist()
+
+
+class CachedScores:
+    """Result of a ScoreCache lookup for one batch of loans
+
+    hits marks the rows found in the cache, whose class probabilities and
+    cluster IDs are in probabilities and clusters (in row order); the other
+    rows still need scoring.
+    """
+
+    def __init__(self, owner, version, keys, hits, probabilities, clusters):
+        self.owner = owner
+        self.version = version
+        self.keys = keys
+        self.hits = hits
+        self.probabilities = probabilities
+        self.clusters = clusters
+
+    @property
+    def missing(self):
+        return ~self.hits
+
+    @property
+    def hit_count(self):
+        return int(self.hits.sum())
+
+    def merge(self, cached, scored):
+        """Full-batch array from the cached rows' values and the scored missing rows' values"""
+        if cached is None:
+            return scored
+        values = np.empty((len(self.hits),) + scored.shape[1:], dtype=np.result_type(cached, scored))
+        values[self.hits] = cached
+        values[self.missing] = scored
+        return values
+
+
+class ScoreCache:
+    """Scores of recently seen loans, keyed by their feature vector
+
+    Maps a loan's feature row to its class probabilities and cluster ID, so
+    loans re-sent unchanged skip inference. All entries belong to one model:
+    owner is the tuple of objects that computed them (model, clusterer),
+    labelled with the model version, and storing scores from a different
+    owner starts the cache over. Past max_rows the least recently used
+    loans are evicted. Values live in preallocated arrays; the dict only
+    maps keys to array slots.
+    """
+
+    def __init__(self, max_rows=200000):
+        self.max_rows = max_rows
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._owner = None
+        self._slots = OrderedDict()
+        self._probabilities = None
+        self._clusters = None
+        self._lock = threading.Lock()
+
+    def lookup(self, owner, X, version=None):
+        """Cached scores for the rows of feature matrix X under owner, as CachedScores
+
+        version: model version of owner, recorded with the scores it stores
+        """
+        keys = row_keys(X)
+        hits = np.zeros(len(keys), dtype=bool)
+        probabilities = clusters = None
+        with self._lock:
+            if self.max_rows > 0 and self._owned_by(owner) and self._slots:
+                slots = self._slots
+                positions = []
+                found = []
+                for position, key in enumerate(keys):
+                    slot = slots.get(key)
+                    if slot is not None:
+                        slots.move_to_end(key)
+                        positions.append(position)
+                        found.append(slot)
+                if found:
+                    hits[positions] = True
+                    probabilities = self._probabilities[found]
+                    clusters = self._clusters[found]
+            hit_count = int(hits.sum())
+            self.hits += hit_count
+            self.misses += len(keys) - hit_count
+        return CachedScores(owner, version, keys, hits, probabilities, clusters)
+
+    def store(self, cached, probabilities, clusters):
+        """Cache the scores of the rows a lookup missed
+
+        probabilities, clusters: values of every row of the looked-up batch
+        """
+        if self.max_rows <= 0:
+            return
+        missing = cached.missing
+        keys = [key for key, hit in zip(cached.keys, cached.hits.tolist()) if not hit]
+        # A batch larger than the cache only keeps its last rows
+        probabilities = np.asarray(probabilities)[missing][-self.max_rows:]
+        clusters = np.asarray(clusters)[missing][-self.max_rows:]
+        keys = keys[-self.max_rows:]
+        if not keys:
+            return
+
+        with self._lock:
+            if not self._owned_by(cached.owner) or self._probabilities is None:
+                self._reset(cached.owner, probabilities.shape[1])
+                self.version = cached.version
+            slots = self._slots
+            targets = []
+            for key in keys:
+                slot = slots.get(key)
+                if slot is None:
+                    if len(slots) < self.max_rows:
+                        slot = len(slots)
+                    else:
+                        _, slot = slots.popitem(last=False)
+                        self.evictions += 1
+                    slots[key] = slot
+                else:
+                    slots.move_to_end(key)
+                targets.append(slot)
+            self._probabilities[targets] = probabilities
+            self._clusters[targets] = clusters
+
+    def clear(self):
+        with self._lock:
+            self._reset(None, 0)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'model_version': self.version,
+                'rows': len(self._slots),
+                'max_rows': self.max_rows,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+                'evictions': self.evictions
+            }
+
+    def _owned_by(self, owner):
+        return (
+            self._owner is not None and len(self._owner) == len(owner) and
+            all(mine is theirs for mine, theirs in zip(self._owner, owner))
+        )
+
+    def _reset(self, owner, n_classes):
+        self._owner = owner
+        self.version = None
+        self._slots = OrderedDict()
+        if owner is None:
+            self._probabilities = self._clusters = None
+        else:
+            # Untouched pages of the arrays cost no memory
+            self._probabilities = np.empty((self.max_rows, n_classes))
+            self._clusters = np.empty(self.max_rows, dtype=np.intp)
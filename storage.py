@@ -0,0 +1,228 @@
+import io
+import os
+import gzip
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future
+
+from botocore.exceptions import ClientError
+
+from s3_uploader import S3Uploader
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def completed(result=True):
+    """A Future that is already done, for backends that write synchronously"""
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+class Storage:
+    """Object storage for raw uploads, archived portfolios and model versions
+
+    Keys are '/'-separated paths such as 'raw/loans.csv'. Every write returns
+    a Future resolving to True once the data is stored, so callers work the
+    same whether a backend writes inline or in the background; compress
+    stores a gzipped copy under '<key>.gz'. Reads stream through open().
+
+    Remote backends also hold copies of the scored portfolios and model
+    versions; the local backend shares a disk with the portfolio store and
+    model registry, so it only keeps raw uploads.
+    """
+
+    name = None
+    remote = True
+
+    def put_bytes(self, key, data, compress=False, after=()):
+        raise NotImplementedError
+
+    def put_file(self, key, path, compress=False, delete=False, after=()):
+        """Store a local file, streamed from disk
+
+        delete removes the file once it is stored; a file that could not be
+        stored is kept.
+        """
+        raise NotImplementedError
+
+    def open(self, key):
+        """Binary file object streaming the stored data, or None if the key doesn't exist"""
+        raise NotImplementedError
+
+    def get_bytes(self, key):
+        stream = self.open(key)
+        if stream is None:
+            return None
+        try:
+            return stream.read()
+        finally:
+            stream.close()
+
+    def flush(self, timeout=None):
+        """Wait for every write queued so far, returns True if all succeeded"""
+        return True
+
+    def _dependencies_ok(self, key, after):
+        if all(future.result() for future in after):
+            return True
+        print(f"Skipping storage write of {key}: a write it depends on failed")
+        return False
+
+
+class LocalStorage(Storage):
+    """Files under a root folder, written atomically through a temporary file"""
+
+    name = 'local'
+    remote = False
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key):
+        parts = key.split('/')
+        if any(part in ('', '.', '..') for part in parts):
+            raise ValueError(f'Invalid storage key: {key}')
+        return os.path.join(self.root, *parts)
+
+    def put_bytes(self, key, data, compress=False, after=()):
+        if not self._dependencies_ok(key, after):
+            return completed(False)
+
+        if compress:
+            key, data = f'{key}.gz', gzip.compress(data)
+        with self._writer(key) as f:
+            f.write(data)
+        return completed()
+
+    def put_file(self, key, path, compress=False, delete=False, after=()):
+        if not self._dependencies_ok(key, after):
+            return completed(False)
+
+        if delete and not compress:
+            # Moving within the same filesystem is a rename, nothing is copied
+            target = self.path(key)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(path, target)
+            return completed()
+
+        if compress:
+            key = f'{key}.gz'
+        with open(path, 'rb') as src, self._writer(key) as raw:
+            if compress:
+                with gzip.GzipFile(fileobj=raw, mode='wb') as dst:
+                    shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+            else:
+                shutil.copyfileobj(src, raw, COPY_BUFFER_SIZE)
+        if delete:
+            os.remove(path)
+        return completed()
+
+    def open(self, key):
+        try:
+            return open(self.path(key), 'rb')
+        except FileNotFoundError:
+            return None
+
+    def _writer(self, key):
+        # Readers never see a partially written file
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        return _AtomicFile(target)
+
+
+class _AtomicFile:
+    """Binary file written to a temporary name and renamed into place on success"""
+
+    def __init__(self, target):
+        self.target = target
+        fd, self.tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+        self.file = os.fdopen(fd, 'wb')
+
+    def __enter__(self):
+        return self.file
+
+    def __exit__(self, exc_type, exc, tb):
+        self.file.close()
+        if exc_type is None:
+            os.replace(self.tmp_path, self.target)
+        else:
+            os.remove(self.tmp_path)
+
+
+class MemoryStorage(Storage):
+    """Process-local dict of bytes, a stand-in for S3 in benchmarks and tests"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    def put_bytes(self, key, data, compress=False, after=()):
+        if not self._dependencies_ok(key, after):
+            return completed(False)
+
+        if compress:
+            key, data = f'{key}.gz', gzip.compress(data)
+        with self._lock:
+            self.objects[key] = bytes(data)
+        return completed()
+
+    def put_file(self, key, path, compress=False, delete=False, after=()):
+        if not self._dependencies_ok(key, after):
+            return completed(False)
+
+        buffer = io.BytesIO()
+        with open(path, 'rb') as src:
+            if compress:
+                key = f'{key}.gz'
+                with gzip.GzipFile(fileobj=buffer, mode='wb') as dst:
+                    shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+            else:
+                shutil.copyfileobj(src, buffer, COPY_BUFFER_SIZE)
+        with self._lock:
+            self.objects[key] = buffer.getvalue()
+        if delete:
+            os.remove(path)
+        return completed()
+
+    def open(self, key):
+        with self._lock:
+            data = self.objects.get(key)
+        return None if data is None else io.BytesIO(data)
+
+
+class S3Storage(Storage):
+    """S3 bucket, written in the background by an S3Uploader
+
+    get_client returns one shared client, so uploads and reads reuse its
+    connection pool instead of opening a connection per object. Reads stream
+    the object body rather than buffering it.
+    """
+
+    name = 's3'
+
+    def __init__(self, get_client, bucket, **uploader_options):
+        self.get_client = get_client
+        self.bucket = bucket
+        self.uploader = S3Uploader(get_client, bucket, **uploader_options)
+
+    def put_bytes(self, key, data, compress=False, after=()):
+        return self.uploader.put_bytes(key, data, compress=compress, after=after)
+
+    def put_file(self, key, path, compress=False, delete=False, after=()):
+        return self.uploader.put_file(key, path, compress=compress, delete=delete, after=after)
+
+    def open(self, key):
+        try:
+            return self.get_client().get_object(Bucket=self.bucket, Key=key)['Body']
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+                print(f"Error downloading {key} from S3: {e}")
+            return None
+
+    def flush(self, timeout=None):
+        return self.uploader.flush(timeout)
@@ -0,0 +1,19 @@
+import os
+import sys
+import importlib
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """The app module, imported with in-memory storage and its folders in a temporary directory"""
+    cwd = os.getcwd()
+    os.environ.setdefault('STORAGE_BACKEND', 'memory')
+    os.chdir(tmp_path_factory.mktemp('app'))
+    try:
+        yield importlib.import_module('app')
+    finally:
+        os.chdir(cwd)
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from exports import iter_csv, iter_json, iter_ndjson
+
+
+@pytest.fixture(scope='module')
+def portfolio():
+    rng = np.random.default_rng(0)
+    rows = 1000
+    probability = rng.random(rows)
+    probability[::17] = np.nan
+    return pd.DataFrame({
+        'loan_id': [f'L{i}' for i in range(rows)],
+        'loan_amount': rng.integers(1000, 100000, rows),
+        'probability': probability,
+        'region': pd.Categorical(rng.choice(['North', 'South', None], rows)),
+        'recommendations': ['Send "final" notice; call\nback'] * rows
+    })
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 7, 1000, 5000])
+def test_iter_json_matches_to_json(portfolio, chunk_rows):
+    expected = portfolio.to_json(orient='records', indent=2)
+    assert ''.join(iter_json(portfolio, chunk_rows=chunk_rows)) == expected
+
+
+def test_iter_json_positions(portfolio):
+    positions = np.array([3, 4, 10, 500, 999])
+    expected = portfolio.iloc[positions].to_json(orient='records', indent=2)
+    assert ''.join(iter_json(portfolio, positions, chunk_rows=2)) == expected
+
+
+def test_iter_json_empty(portfolio):
+    expected = portfolio.iloc[:0].to_json(orient='records', indent=2)
+    assert ''.join(iter_json(portfolio.iloc[:0])) == expected
+    assert ''.join(iter_json(portfolio, np.array([], dtype=np.intp))) == expected
+
+
+def test_iter_csv_and_ndjson_match_pandas(portfolio):
+    assert ''.join(iter_csv(portfolio, chunk_rows=7)) == portfolio.to_csv(index=False)
+    assert ''.join(iter_ndjson(portfolio, chunk_rows=7)) == portfolio.to_json(orient='records', lines=True)
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from filter_index import FilterIndex
+
+
+@pytest.fixture(scope='module')
+def portfolio():
+    rng = np.random.default_rng(0)
+    rows = 10000
+    probability = rng.random(rows)
+    probability[rng.random(rows) < 0.05] = np.nan
+    region = pd.Categorical(rng.choice(['North', 'South', 'East', 'West', None], rows))
+    return pd.DataFrame({
+        'probability': probability,
+        'loan_amount': rng.integers(1000, 100000, rows).astype(float),
+        'cluster': rng.integers(0, 3, rows),
+        'region': region
+    })
+
+
+def mask_positions(df, ranges=(), equals=()):
+    mask = np.ones(len(df), dtype=bool)
+    for column, low, high in ranges:
+        mask &= ((df[column] >= low) & (df[column] <= high)).to_numpy()
+    for column, value in equals:
+        mask &= (df[column] == value).to_numpy()
+    return np.flatnonzero(mask)
+
+
+def selected(index, df, **filters):
+    positions = index.select(**filters)
+    return np.arange(len(df)) if positions is None else positions
+
+
+def test_select_matches_boolean_masks(portfolio):
+    index = FilterIndex(portfolio, ['probability', 'loan_amount', 'cluster', 'region'])
+    rng = np.random.default_rng(1)
+    for _ in range(200):
+        low, high = np.sort(rng.random(2))
+        amount_low, amount_high = np.sort(rng.integers(0, 110000, 2))
+        ranges = [('probability', low, high), ('loan_amount', amount_low, amount_high)][:rng.integers(0, 3)]
+        equals = [('cluster', int(rng.integers(0, 3))), ('region', rng.choice(['North', 'West']))][:rng.integers(0, 3)]
+        expected = mask_positions(portfolio, ranges, equals)
+        assert np.array_equal(selected(index, portfolio, ranges=ranges, equals=equals), expected)
+
+
+def test_exact_bounds_are_inclusive(portfolio):
+    index = FilterIndex(portfolio, ['loan_amount'])
+    value = portfolio['loan_amount'].iloc[123]
+    ranges = [('loan_amount', value, value)]
+    assert np.array_equal(index.select(ranges=ranges), mask_positions(portfolio, ranges))
+
+
+def test_unfiltered_and_unmatched(portfolio):
+    index = FilterIndex(portfolio, ['cluster', 'region'])
+    assert index.select() is None
+    # A range covering every row is no filter at all
+    assert index.select(ranges=[('cluster', 0, 2)]) is None
+    assert len(index.select(equals=[('region', 'Nowhere')])) == 0
+    assert len(index.select(ranges=[('cluster', 5, 9)])) == 0
+    assert 'probability' not in index
+
+
+def test_precomputed_orders(portfolio):
+    orders = {'loan_amount': np.argsort(portfolio['loan_amount'].to_numpy(), kind='stable')}
+    index = FilterIndex(portfolio, ['loan_amount'], orders)
+    ranges = [('loan_amount', 20000, 40000)]
+    assert np.array_equal(index.select(ranges=ranges), mask_positions(portfolio, ranges))
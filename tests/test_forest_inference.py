@@ -0,0 +1,71 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from forest_inference import CompiledForest
+
+
+def loan_features(rows, seed, missing=0.0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(rows, 6))
+    y = (X[:, 0] + 0.5 * X[:, 1] - X[:, 2] + rng.normal(0, 0.5, rows) > 0).astype(int)
+    X[rng.random(X.shape) < missing] = np.nan
+    return X, y
+
+
+@pytest.fixture(scope='module')
+def model():
+    X, y = loan_features(2000, seed=0)
+    return RandomForestClassifier(n_estimators=30, n_jobs=1, random_state=42).fit(X, y)
+
+
+@pytest.mark.parametrize('rows', [1, 10, 257, 3000])
+def test_predict_proba_is_bit_identical(model, rows):
+    forest = CompiledForest.from_model(model)
+    X, _ = loan_features(rows, seed=1)
+    assert np.array_equal(forest.predict_proba(X), model.predict_proba(X))
+    assert np.array_equal(forest.predict(X), model.predict(X))
+    # Leaf indexes are offsets into the flattened node arrays
+    assert np.array_equal(forest.apply(X) - forest.roots, model.apply(X))
+
+
+def test_small_blocks(model):
+    forest = CompiledForest.from_model(model)
+    X, _ = loan_features(500, seed=2)
+    assert np.array_equal(forest.predict_proba(X, block_elements=100), model.predict_proba(X))
+
+
+def test_threaded_model(model):
+    threaded = RandomForestClassifier(n_estimators=30, random_state=42).set_params(n_jobs=4)
+    threaded.__dict__.update({key: value for key, value in model.__dict__.items() if key != 'n_jobs'})
+    X, _ = loan_features(1000, seed=3)
+    assert np.array_equal(CompiledForest.from_model(threaded).predict_proba(X), threaded.predict_proba(X))
+
+
+def test_missing_values():
+    X, y = loan_features(2000, seed=4, missing=0.1)
+    model = RandomForestClassifier(n_estimators=20, n_jobs=1, random_state=0).fit(X, y)
+    X_test, _ = loan_features(1000, seed=5, missing=0.1)
+    assert np.array_equal(CompiledForest.from_model(model).predict_proba(X_test), model.predict_proba(X_test))
+
+
+def test_multiclass():
+    X, y = loan_features(2000, seed=6)
+    y = y + (X[:, 3] > 0.5)
+    model = RandomForestClassifier(n_estimators=20, n_jobs=1, random_state=0).fit(X, y)
+    X_test, _ = loan_features(500, seed=7)
+    assert np.array_equal(CompiledForest.from_model(model).predict_proba(X_test), model.predict_proba(X_test))
+
+
+def test_memory_mapped(model, tmp_path):
+    path = tmp_path / 'forest.joblib'
+    joblib.dump(CompiledForest.from_model(model), path)
+    forest = joblib.load(path, mmap_mode='r')
+    X, _ = loan_features(100, seed=8)
+    assert np.array_equal(forest.predict_proba(X), model.predict_proba(X))
+
+
+def test_rejects_unfitted_model():
+    with pytest.raises(ValueError):
+        CompiledForest.from_model(RandomForestClassifier())
@@ -0,0 +1,23 @@
+import os
+import time
+
+from jobs import JobQueue
+
+
+def test_old_status_files_are_pruned(tmp_path):
+    queue = JobQueue(str(tmp_path), max_age=3600)
+    job = queue.submit('test', lambda job: 'done')
+    queue._executor.shutdown(wait=True)
+    assert queue.get(job.id)['result'] == 'done'
+
+    stale = tmp_path / 'aa.json'
+    stale.write_text('{}')
+    old = time.time() - 7200
+    os.utime(stale, (old, old))
+
+    # Pruning runs at most once per interval
+    queue.prune_status_files()
+    assert stale.exists()
+    queue.prune_status_files(interval=0)
+    assert not stale.exists()
+    assert os.path.exists(queue._status_path(job.id))
@@ -0,0 +1,51 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio_aggregates import compute_aggregates
+from portfolio_store import PortfolioStore
+
+
+def scored_portfolio(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    probability = rng.random(rows)
+    return pd.DataFrame({
+        'loan_amount': rng.integers(1000, 100000, rows).astype(float),
+        'overdue_days': rng.integers(0, 365, rows).astype(float),
+        'credit_score': rng.integers(300, 850, rows).astype(float),
+        'region': rng.choice(['North', 'South', 'East'], rows),
+        'prediction': (probability > 0.5).astype(int),
+        'probability': probability,
+        'recovery_label': np.where(probability > 0.5, 'Recoverable', 'Unrecoverable'),
+        'cluster': rng.integers(0, 3, rows)
+    })
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PortfolioStore(str(tmp_path))
+
+
+def test_aggregates(store):
+    store.save('loans', scored_portfolio(1000))
+    aggregates = compute_aggregates(store.load('loans'))
+    assert aggregates['summary']['total_loans'] == 1000
+    assert len(aggregates['overdue_recovery']['overdue_days']) == 5
+    assert len(aggregates['heatmap']['z']) == 5
+    assert sorted(aggregates['region_recovery']['region']) == ['East', 'North', 'South']
+
+
+def test_empty_portfolio(store):
+    store.save('empty', scored_portfolio(0))
+    aggregates = compute_aggregates(store.load('empty'))
+    # Stored as JSON next to the portfolio, so it must not contain NaN
+    json.dumps(aggregates, allow_nan=False)
+    assert aggregates['summary']['total_loans'] == 0
+    assert aggregates['summary']['avg_probability'] is None
+    assert aggregates['overdue_recovery'] == {'overdue_days': [], 'prediction': []}
+    assert aggregates['amount_recovery'] == {'loan_amount': [], 'prediction': []}
+    assert aggregates['heatmap'] == {'x': [], 'y': [], 'z': []}
+    assert aggregates['label_distribution'] == {'labels': [], 'counts': []}
+    assert aggregates['region_recovery'] == {'region': [], 'prediction': []}
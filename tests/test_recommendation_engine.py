@@ -0,0 +1,52 @@
+import numpy as np
+
+
+def baseline_recommendations(prediction, probability, cluster):
+    # get_recovery_recommendations before the RecommendationEngine, one loan at a time
+    recommendations = []
+    if prediction == 1 and probability > 0.8:
+        recommendations.extend(["Send gentle reminder via email/SMS", "Offer payment plan with 5% discount", "Schedule follow-up call within 3 days"])
+    elif prediction == 1 and probability > 0.6:
+        recommendations.extend(["Send formal payment reminder", "Offer payment plan with 3% discount", "Schedule follow-up call within 7 days"])
+    elif prediction == 0 and probability < 0.4:
+        recommendations.extend(["Initiate legal proceedings", "Send final demand notice", "Consider debt collection agency"])
+    else:
+        recommendations.extend(["Send urgent payment reminder", "Offer payment plan with 10% discount", "Schedule immediate follow-up call", "Consider restructuring the loan"])
+
+    if cluster == 0:
+        recommendations.append("Standard recovery process")
+    elif cluster == 1:
+        recommendations.append("Enhanced monitoring required")
+    else:
+        recommendations.append("Aggressive recovery strategy needed")
+    return recommendations
+
+
+def loans(rows=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    predictions = rng.integers(0, 2, rows)
+    # Rule boundaries and the ends of the range, next to random probabilities
+    probabilities = np.concatenate([[0.0, 0.4, 0.6, 0.8, 1.0] * 4, rng.random(rows - 20)])
+    clusters = rng.integers(-1, 5, rows)
+    return predictions, probabilities, clusters
+
+
+def test_set_ids_match_baseline(app_module):
+    engine = app_module.recommendation_engine
+    predictions, probabilities, clusters = loans()
+    expected = [
+        baseline_recommendations(prediction, probability, cluster)
+        for prediction, probability, cluster in zip(predictions.tolist(), probabilities.tolist(), clusters.tolist())
+    ]
+
+    set_ids = engine.set_ids(predictions, probabilities, clusters)
+    assert engine.expand(set_ids) == expected
+    assert engine.join(set_ids) == ['; '.join(recs) for recs in expected]
+    assert engine.join(set_ids, ', ') == [', '.join(recs) for recs in expected]
+
+
+def test_recommend_matches_baseline(app_module):
+    predictions, probabilities, clusters = loans(rows=200, seed=1)
+    for prediction, probability, cluster in zip(predictions.tolist(), probabilities.tolist(), clusters.tolist()):
+        expected = baseline_recommendations(prediction, probability, cluster)
+        assert app_module.get_recovery_recommendations(prediction, probability, cluster) == expected
@@ -0,0 +1,131 @@
+import gzip
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+
+from s3_uploader import S3Uploader
+
+moto = pytest.importorskip('moto')
+
+BUCKET = 'loan-recovery-test'
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    for name in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_SESSION_TOKEN'):
+        monkeypatch.setenv(name, 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    with moto.mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def read(client, key):
+    return client.get_object(Bucket=BUCKET, Key=key)
+
+
+def keys(client):
+    return [item['Key'] for item in client.list_objects_v2(Bucket=BUCKET).get('Contents', [])]
+
+
+class FlakyClient:
+    """S3 client whose first put_object calls fail"""
+
+    def __init__(self, client, failures):
+        self.client = client
+        self.failures = failures
+
+    def put_object(self, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise ClientError({'Error': {'Code': 'SlowDown', 'Message': 'Slow down'}}, 'PutObject')
+        return self.client.put_object(**kwargs)
+
+
+def test_put_bytes(s3_client):
+    uploads = []
+    uploader = S3Uploader(lambda: s3_client, BUCKET, on_upload=lambda key, seconds, size, uploaded: uploads.append((key, size, uploaded)))
+    future = uploader.put_bytes('uploads/a.csv', b'loan_id,loan_amount\n1,5000\n')
+    assert uploader.flush(timeout=30)
+    assert future.result() is True
+    assert read(s3_client, 'uploads/a.csv')['Body'].read() == b'loan_id,loan_amount\n1,5000\n'
+    assert uploads == [('uploads/a.csv', 27, True)]
+    assert uploader.stats == {'queued': 1, 'uploaded': 1, 'failed': 0, 'retries': 0, 'bytes': 27}
+    assert uploader.pending() == 0
+
+
+def test_compressed_uploads(s3_client, tmp_path):
+    data = b'loan_id,loan_amount\n' + b''.join(b'%d,5000\n' % i for i in range(10000))
+    path = tmp_path / 'results.csv'
+    path.write_bytes(data)
+    uploader = S3Uploader(lambda: s3_client, BUCKET)
+    uploader.put_bytes('results/a.csv', data, compress=True)
+    uploader.put_file('results/b.csv', str(path), compress=True)
+    assert uploader.flush(timeout=30)
+
+    assert sorted(keys(s3_client)) == ['results/a.csv.gz', 'results/b.csv.gz']
+    for key in keys(s3_client):
+        obj = read(s3_client, key)
+        assert obj['ContentEncoding'] == 'gzip'
+        assert gzip.decompress(obj['Body'].read()) == data
+    # Without delete the file is kept, the temporary gzip copy is not
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_multipart_uploads(s3_client, tmp_path):
+    data = bytes(range(256)) * (11 * 1024 * 1024 // 256)
+    path = tmp_path / 'portfolio.bin'
+    path.write_bytes(data)
+    threshold = 5 * 1024 * 1024
+    uploader = S3Uploader(lambda: s3_client, BUCKET, multipart_threshold=threshold, multipart_chunksize=threshold)
+    uploader.put_bytes('portfolios/a.bin', data)
+    uploader.put_file('portfolios/b.bin', str(path), delete=True)
+    assert uploader.flush(timeout=60)
+
+    for key in ('portfolios/a.bin', 'portfolios/b.bin'):
+        obj = read(s3_client, key)
+        # Multipart ETags end with the number of parts
+        assert obj['ETag'].strip('"').endswith('-3')
+        assert obj['Body'].read() == data
+    assert not path.exists()
+
+
+def test_retries(s3_client):
+    flaky = FlakyClient(s3_client, failures=2)
+    uploader = S3Uploader(lambda: flaky, BUCKET, max_retries=3, retry_delay=0)
+    assert uploader.put_bytes('uploads/a.csv', b'data').result() is True
+    assert read(s3_client, 'uploads/a.csv')['Body'].read() == b'data'
+    assert uploader.stats['retries'] == 2
+    assert uploader.stats['uploaded'] == 1
+
+
+def test_failed_upload_skips_dependents(s3_client, tmp_path):
+    flaky = FlakyClient(s3_client, failures=10)
+    uploads = []
+    uploader = S3Uploader(lambda: flaky, BUCKET, max_retries=1, retry_delay=0,
+                          on_upload=lambda key, seconds, size, uploaded: uploads.append((key, uploaded)))
+    path = tmp_path / 'model.joblib'
+    path.write_bytes(b'model')
+    first = uploader.put_bytes('models/v1/model.joblib', b'model')
+    dependent = uploader.put_file('models/CURRENT', str(path), delete=True, after=[first])
+
+    assert uploader.flush(timeout=30) is False
+    assert first.result() is False
+    assert dependent.result() is False
+    assert keys(s3_client) == []
+    # The dependent upload was never attempted and its file is kept
+    assert uploads == [('models/v1/model.joblib', False)]
+    assert path.exists()
+    assert uploader.stats['failed'] == 2
+    assert uploader.stats['retries'] == 1
+
+
+def test_missing_bucket(s3_client):
+    uploader = S3Uploader(lambda: s3_client, 'no-such-bucket', max_retries=0)
+    assert uploader.put_bytes('uploads/a.csv', b'data').result() is False
+    assert uploader.stats['failed'] == 1
+    # A failure is reported by the next flush even if it finished before it
+    assert uploader.flush(timeout=30) is False
+    assert uploader.flush(timeout=30) is True